@@ -5,6 +5,8 @@ Script to create nested folder structure for SAT Knowledge based on the SAT_STRU
 
 import os
 import json
+import collections
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Base directory
@@ -198,107 +200,128 @@ sat_structure = {
   }
 }
 
+# Markdown templates for the generated files (rendered once per topic name)
+STUDY_TEMPLATE = (
+    "# {name} Study Notes\n\n"
+    "## Key Concepts\n\n"
+    "- \n\n"
+    "## Formulas and Rules\n\n"
+    "- \n\n"
+    "## Common Mistakes to Avoid\n\n"
+    "- \n\n"
+    "## Practice Tips\n\n"
+    "- \n\n"
+)
+
+OVERVIEW_TEMPLATE = (
+    "# {name} Overview\n\n"
+    "## Introduction\n\n"
+    "This section covers key concepts in {name}.\n\n"
+    "## Subtopics\n\n"
+    "- \n\n"
+    "## Resources\n\n"
+    "- \n\n"
+)
+
 # Function to create markdown files for a given folder
 def create_markdown_files(folder_path, topic_name):
     """
     Create StudyNotes and Overview markdown files for the given folder
-    
+
     Args:
         folder_path (Path): Path to the folder
         topic_name (str): Name of the topic for the files
     """
-    # Create StudyNotes markdown file
+    # Create StudyNotes markdown file with a single buffered write
     study_notes_path = folder_path / f"{topic_name}StudyNotes.md"
-    with open(study_notes_path, "w") as f:
-        f.write(f"# {topic_name} Study Notes\n\n")
-        f.write(f"## Key Concepts\n\n")
-        f.write(f"- \n\n")
-        f.write(f"## Formulas and Rules\n\n")
-        f.write(f"- \n\n")
-        f.write(f"## Common Mistakes to Avoid\n\n")
-        f.write(f"- \n\n")
-        f.write(f"## Practice Tips\n\n")
-        f.write(f"- \n\n")
-    
-    # Create Overview markdown file
+    study_notes_path.write_text(STUDY_TEMPLATE.format(name=topic_name))
+
+    # Create Overview markdown file with a single buffered write
     overview_path = folder_path / f"{topic_name}Overview.md"
-    with open(overview_path, "w") as f:
-        f.write(f"# {topic_name} Overview\n\n")
-        f.write(f"## Introduction\n\n")
-        f.write(f"This section covers key concepts in {topic_name}.\n\n")
-        f.write(f"## Subtopics\n\n")
-        f.write(f"- \n\n")
-        f.write(f"## Resources\n\n")
-        f.write(f"- \n\n")
+    overview_path.write_text(OVERVIEW_TEMPLATE.format(name=topic_name))
 
-# Create domain and skill folders along with markdown files
-created_folders = []
-created_files = []
+# Function to create one node of the structure (folder + markdown files)
+def create_node(task):
+    """
+    Create the folder and markdown files for one structure node.
+
+    Args:
+        task (tuple): (path, topic_name, metadata_dict) describing the node
+    """
+    path, topic_name, metadata = task
+    # parents=True so a skill node can run before its subject/domain node
+    path.mkdir(parents=True, exist_ok=True)
+    create_markdown_files(path, topic_name)
+
+# Collect one task per subject/domain/skill node; track counts plus a
+# bounded sample for reporting instead of accumulating every path
+tasks = []
+folder_count = 0
+file_count = 0
+folder_sample = collections.deque(maxlen=5)
+file_sample = collections.deque(maxlen=5)
+
+def track_folder(path):
+    global folder_count
+    folder_count += 1
+    folder_sample.append(str(path))
+
+def track_files(path, topic_name):
+    global file_count
+    file_count += 2
+    file_sample.append(str(path / f"{topic_name}StudyNotes.md"))
+    file_sample.append(str(path / f"{topic_name}Overview.md"))
 
 for subject_id, subject_data in sat_structure.items():
     subject_path = base_dir / subject_id
-    
-    # Ensure the subject folder exists
-    subject_path.mkdir(exist_ok=True)
-    
-    # Create markdown files for the subject
-    create_markdown_files(subject_path, subject_data["name"])
-    created_files.append(str(subject_path / f"{subject_data['name']}StudyNotes.md"))
-    created_files.append(str(subject_path / f"{subject_data['name']}Overview.md"))
-    
-    # Create a metadata file for the subject
-    with open(subject_path / "metadata.json", "w") as f:
-        json.dump({
-            "id": subject_id,
-            "name": subject_data["name"],
-            "description": subject_data["description"]
-        }, f, indent=2)
-    
-    # Create domain folders
+    tasks.append((subject_path, subject_data["name"], {
+        "id": subject_id,
+        "name": subject_data["name"],
+        "description": subject_data["description"]
+    }))
+    track_files(subject_path, subject_data["name"])
+
     for domain in subject_data["domains"]:
         domain_path = subject_path / domain["id"]
-        domain_path.mkdir(exist_ok=True)
-        created_folders.append(str(domain_path))
-        
-        # Create markdown files for the domain
-        create_markdown_files(domain_path, domain["name"])
-        created_files.append(str(domain_path / f"{domain['name']}StudyNotes.md"))
-        created_files.append(str(domain_path / f"{domain['name']}Overview.md"))
-        
-        # Create a metadata file for the domain
-        with open(domain_path / "metadata.json", "w") as f:
-            json.dump({
-                "id": domain["id"],
-                "name": domain["name"],
-                "description": domain["description"]
-            }, f, indent=2)
-        
-        # Create skill folders
+        tasks.append((domain_path, domain["name"], {
+            "id": domain["id"],
+            "name": domain["name"],
+            "description": domain["description"]
+        }))
+        track_folder(domain_path)
+        track_files(domain_path, domain["name"])
+
         for skill in domain["skills"]:
             skill_path = domain_path / skill["id"]
-            skill_path.mkdir(exist_ok=True)
-            created_folders.append(str(skill_path))
-            
-            # Create markdown files for the skill
-            create_markdown_files(skill_path, skill["name"])
-            created_files.append(str(skill_path / f"{skill['name']}StudyNotes.md"))
-            created_files.append(str(skill_path / f"{skill['name']}Overview.md"))
-            
-            # Create a metadata file for the skill
-            with open(skill_path / "metadata.json", "w") as f:
-                json.dump({
-                    "id": skill["id"],
-                    "name": skill["name"]
-                }, f, indent=2)
+            tasks.append((skill_path, skill["name"], {
+                "id": skill["id"],
+                "name": skill["name"]
+            }))
+            track_folder(skill_path)
+            track_files(skill_path, skill["name"])
+
+# The per-node work is independent and I/O bound, so overlap the
+# filesystem syscalls across a thread pool
+with ThreadPoolExecutor(max_workers=16) as pool:
+    list(pool.map(create_node, tasks))
+
+# Write all node metadata as a single newline-delimited manifest instead
+# of one tiny metadata.json per folder
+manifest_path = base_dir / "sat_structure_manifest.jsonl"
+manifest_path.write_text("\n".join(
+    json.dumps({"path": str(path), **metadata})
+    for path, _, metadata in tasks
+))
+print(f"Wrote manifest with {len(tasks)} entries to {manifest_path}")
 
-print(f"Created {len(created_folders)} folders:")
-for folder in created_folders[:5]:  # Show only first 5 folders
+print(f"Created {folder_count} folders:")
+for folder in folder_sample:  # Show only a 5-folder sample
     print(f"  - {folder}")
-if len(created_folders) > 5:
-    print(f"  - ... and {len(created_folders) - 5} more")
+if folder_count > 5:
+    print(f"  - ... and {folder_count - 5} more")
 
-print(f"\nCreated {len(created_files)} markdown files:")
-for file in created_files[:5]:  # Show only first 5 files
+print(f"\nCreated {file_count} markdown files:")
+for file in file_sample:  # Show only a 5-file sample
     print(f"  - {file}")
-if len(created_files) > 5:
-    print(f"  - ... and {len(created_files) - 5} more")
+if file_count > 5:
+    print(f"  - ... and {file_count - 5} more")
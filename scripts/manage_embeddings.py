@@ -8,6 +8,7 @@ Utility script to check status, rebuild, and manage the embedding database.
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add parent directory to Python path to import from src
@@ -21,6 +22,17 @@ try:
 except ImportError:
     pass
 
+# Shared RAG instance; Chroma + Gemini client init is expensive, so all
+# commands reuse a single lazily constructed system
+_RAG = None
+
+def _get_rag():
+    """Return the shared SATKnowledgeRAG instance, constructing it on first use."""
+    global _RAG
+    if _RAG is None:
+        _RAG = SATKnowledgeRAG(os.getenv("GEMINI_API_KEY"), "satKnowledge")
+    return _RAG
+
 def check_status():
     """Check the status of the embedding system"""
     print("🔍 Checking embedding system status...")
@@ -51,7 +63,7 @@ def check_status():
     
     # Initialize RAG system and get stats
     try:
-        rag_system = SATKnowledgeRAG(api_key, knowledge_base_path)
+        rag_system = _get_rag()
         stats = rag_system.get_stats()
         
         print(f"✅ RAG System: Initialized successfully")
@@ -64,7 +76,8 @@ def check_status():
         for subject in ['math', 'english']:
             subject_path = Path(knowledge_base_path) / subject
             if subject_path.exists():
-                file_count = len(list(subject_path.glob('**/*.md')))
+                # Generator sum avoids materializing a throwaway list of Paths
+                file_count = sum(1 for _ in subject_path.rglob('*.md'))
                 total_files += file_count
         
         print(f"📁 Markdown files in knowledge base: {total_files}")
@@ -97,7 +110,7 @@ def rebuild_index():
     
     try:
         print("🚀 Initializing RAG system...")
-        rag_system = SATKnowledgeRAG(api_key, knowledge_base_path)
+        rag_system = _get_rag()
         
         print("🗑️  Rebuilding index...")
         start_time = time.time()
@@ -121,8 +134,8 @@ def test_search():
         return
     
     try:
-        rag_system = SATKnowledgeRAG(api_key, "satKnowledge")
-        
+        rag_system = _get_rag()
+
         test_queries = [
             ("linear equations", "math"),
             ("command of evidence", "english"),
@@ -134,9 +147,11 @@ def test_search():
         
         print("🔍 Running test queries...")
         print("-" * 60)
-        
-        for query, subject in test_queries:
-            results = rag_system.search(query, subject_filter=subject, max_results=2)
+
+        # Embed all test queries in one API call instead of one per query
+        results_per_query = rag_system.batch_search(test_queries, max_results=2)
+
+        for (query, subject), results in zip(test_queries, results_per_query):
             print(f"Query: '{query}' (Subject: {subject})")
             print(f"  Results found: {len(results)}")
             
@@ -161,31 +176,36 @@ def interactive_search():
         return
     
     try:
-        rag_system = SATKnowledgeRAG(api_key, "satKnowledge")
-        
-        while True:
-            query = input("\n🔍 Enter search query: ").strip()
-            if query.lower() in ['quit', 'exit', 'q']:
-                print("👋 Goodbye!")
-                break
-            
-            if not query:
-                continue
-            
-            subject = input("📚 Subject filter (math/english/all): ").strip() or "all"
-            
-            results = rag_system.search(query, subject_filter=subject, max_results=5)
-            
-            if results:
-                print(f"\n📊 Found {len(results)} results:")
-                for i, result in enumerate(results):
-                    score = result.get('similarity_score', 0)
-                    title = result.get('title', 'Unknown')
-                    subject = result.get('subject', 'Unknown')
-                    print(f"  {i+1}. {title} ({subject}) - Score: {score:.3f}")
-            else:
-                print("❌ No results found")
-                
+        rag_system = _get_rag()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while True:
+                query = input("\n🔍 Enter search query: ").strip()
+                if query.lower() in ['quit', 'exit', 'q']:
+                    print("👋 Goodbye!")
+                    break
+
+                if not query:
+                    continue
+
+                # Start the embedding request now so the API call is in
+                # flight while the user types the subject filter
+                embedding_future = executor.submit(rag_system._generate_query_embedding, query)
+
+                subject = input("📚 Subject filter (math/english/all): ").strip() or "all"
+
+                results = rag_system._query_with_embedding(embedding_future.result(), subject, 5)
+
+                if results:
+                    print(f"\n📊 Found {len(results)} results:")
+                    for i, result in enumerate(results):
+                        score = result.get('similarity_score', 0)
+                        title = result.get('title', 'Unknown')
+                        subject = result.get('subject', 'Unknown')
+                        print(f"  {i+1}. {title} ({subject}) - Score: {score:.3f}")
+                else:
+                    print("❌ No results found")
+
     except Exception as e:
         print(f"❌ Error: {e}")
 
@@ -13,7 +13,8 @@ from dotenv import load_dotenv
 import sys
 
 # Add project root to Python path to allow importing from src
-sys.path.append(str(Path(__file__).resolve().parents[1]))
+# (lexical dirname join avoids the readlink/getcwd syscalls of resolve())
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.rag_system import SATKnowledgeRAG
 
@@ -52,7 +53,8 @@ def main():
     for subject in ['math', 'english']:
         subject_path = Path(knowledge_base_path) / subject
         if subject_path.exists():
-            file_count = len(list(subject_path.glob('**/*.md')))
+            # Generator sum avoids materializing a throwaway list of Paths
+            file_count = sum(1 for _ in subject_path.rglob('*.md'))
             print(f"   {subject.title()}: {file_count} markdown files")
             total_files += file_count
     
@@ -62,7 +64,19 @@ def main():
     if total_files == 0:
         print("⚠️  No markdown files found in knowledge base")
         return
-    
+
+    # Fast path: skip the full embedding pass when no markdown file has
+    # changed since the last successful build
+    watermark_path = Path("chroma_db") / ".last_build"
+    newest_mtime = max(p.stat().st_mtime for p in Path(knowledge_base_path).rglob('*.md'))
+    if watermark_path.exists():
+        try:
+            if float(watermark_path.read_text()) >= newest_mtime:
+                print("✅ Embeddings are already up-to-date (no knowledge files changed)")
+                return
+        except ValueError:
+            pass  # Unreadable watermark; fall through to a full build
+
     # Confirm before proceeding
     response = input("🤔 Do you want to proceed with embedding generation? (y/N): ")
     if response.lower() not in ['y', 'yes']:
@@ -82,7 +96,11 @@ def main():
         
         # Get statistics
         stats = rag_system.get_stats()
-        
+
+        # Record the watermark so unchanged reruns can skip the build
+        watermark_path.parent.mkdir(exist_ok=True)
+        watermark_path.write_text(str(newest_mtime))
+
         end_time = time.time()
         duration = end_time - start_time
         
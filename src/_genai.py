@@ -0,0 +1,26 @@
+"""
+Shared Gemini client factory for the Agentic AI App
+
+The planner, executor, and RAG system each talked to Gemini, and each
+used to construct its own genai.Client — three separate auth setups and
+HTTP connection pools for one process. Caching one client per API key
+lets every caller reuse the same warmed-up pool.
+"""
+
+import functools
+
+from google import genai
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(api_key: str) -> genai.Client:
+    """
+    Return the shared Gemini client for an API key.
+
+    Args:
+        api_key (str): Google API key for Gemini access
+
+    Returns:
+        genai.Client: The process-wide client for that key
+    """
+    return genai.Client(api_key=api_key)
@@ -5,30 +5,241 @@ This module is responsible for executing tasks and calling tools/APIs as needed
 based on the plan created by the Planner.
 """
 
-from typing import Dict, Any, List, Callable, Optional
+from typing import Dict, Any, List, Callable, Optional, Tuple
 from google import genai
+import ast
+import asyncio
+import collections
+import functools
 import json
+import time
+import numpy as np
+from _genai import get_client
 from rag_system import SATKnowledgeRAG
 
+# Deletes every allowed calculator character; anything left over is invalid
+_CALC_TRANS = str.maketrans('', '', '0123456789+-*/()^. ')
+
+# AST node types permitted in calculator expressions
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd,
+)
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expr(expression: str):
+    """
+    Validate and compile a calculator expression to a reusable code object.
+
+    Only numeric literals and basic arithmetic operators are accepted;
+    anything else raises ValueError. Repeated expressions skip the
+    parse/compile entirely via the LRU cache.
+    """
+    tree = ast.parse(expression, mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError("only numeric constants are allowed")
+    return compile(tree, '<calc>', 'eval')
+
+class _SemanticCache:
+    """
+    Semantic cache over L2-normalized task-description embeddings.
+
+    Returns a previously computed result when a new description's cosine
+    similarity to a cached one clears the threshold, so repeated or
+    paraphrased tasks skip the Gemini round trip entirely. Entries expire
+    after a TTL and the least recently used entry is evicted at capacity.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], threshold: float = 0.9,
+                 capacity: int = 256, ttl: float = 300.0):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            embed_fn (Callable): Function that embeds a text into a vector
+            threshold (float): Minimum cosine similarity for a cache hit
+            capacity (int): Maximum number of cached entries (LRU eviction)
+            ttl (float): Seconds before a cached entry expires
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        # key -> {"result": Any, "params": ..., "timestamp": float, "hits": int}
+        self.entries = collections.OrderedDict()
+        # Cached vectors live in one contiguous float32 matrix so each
+        # lookup is a single matmul with no per-call stacking; rows are
+        # reclaimed via swap-delete and the matrix grows geometrically
+        self._matrix = None
+        self._rows = 0
+        self._row_of = {}
+        self._key_at = []
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed and L2-normalize text; returns None if embedding fails."""
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return None
+            return vector / norm
+        except Exception as e:
+            print(f"Error embedding cache key: {e}")
+            return None
+
+    def _remove(self, key):
+        """Remove an entry, swapping the last matrix row into its slot."""
+        row = self._row_of.pop(key)
+        del self.entries[key]
+        last = self._rows - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            moved_key = self._key_at[last]
+            self._key_at[row] = moved_key
+            self._row_of[moved_key] = row
+        self._key_at.pop()
+        self._rows = last
+
+    def lookup(self, text: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Optional[np.ndarray], Optional[Any]]:
+        """
+        Look up a cached result for text.
+
+        Args:
+            text (str): The query text to look up
+            params (Optional[Dict[str, Any]]): Extra parameters that must match
+                exactly for a hit (e.g. a subject filter)
+
+        Returns:
+            Tuple[Optional[np.ndarray], Optional[Any]]: The query embedding
+            (reusable for store) and the cached result, or None on a miss
+        """
+        vector = self._embed(text)
+        if vector is None or not self.entries:
+            return vector, None
+
+        # Drop expired entries before matching
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if now - entry["timestamp"] > self.ttl]
+        for key in expired:
+            self._remove(key)
+        if not self.entries:
+            return vector, None
+
+        # One matmul over the contiguous in-use rows
+        similarities = self._matrix[:self._rows] @ vector
+
+        # Walk candidates best-first until one passes the params guard
+        for row in np.argsort(similarities)[::-1]:
+            if similarities[row] < self.threshold:
+                break
+            key = self._key_at[row]
+            entry = self.entries[key]
+            if entry["params"] == params:
+                entry["hits"] += 1
+                self.entries.move_to_end(key)
+                return vector, entry["result"]
+
+        return vector, None
+
+    def store(self, text: str, vector: Optional[np.ndarray], result: Any,
+              params: Optional[Dict[str, Any]] = None):
+        """
+        Store a result under the given text/embedding.
+
+        Args:
+            text (str): The query text used as the cache key
+            vector (Optional[np.ndarray]): Embedding from lookup(); None skips caching
+            result (Any): The result to cache
+            params (Optional[Dict[str, Any]]): Parameters the entry is scoped to
+        """
+        if vector is None:
+            return
+        key = (text, json.dumps(params, sort_keys=True))
+        if key in self._row_of:
+            self._remove(key)
+
+        # Grow the backing matrix geometrically as needed
+        if self._matrix is None:
+            self._matrix = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif self._rows == self._matrix.shape[0]:
+            grown = np.empty((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:self._rows] = self._matrix[:self._rows]
+            self._matrix = grown
+
+        self._matrix[self._rows] = vector
+        self._row_of[key] = self._rows
+        self._key_at.append(key)
+        self._rows += 1
+
+        self.entries[key] = {
+            "result": result,
+            "params": params,
+            "timestamp": time.time(),
+            "hits": 0
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self._remove(next(iter(self.entries)))
+
 class Executor:
     """
     Executor class that handles the execution of planned tasks,
     including tool calling and result processing.
     """
-    
-    def __init__(self, api_key: str):
+
+    # Prompt templates built once at class definition; only the per-task
+    # fields are interpolated at call time
+    _TASK_TEMPLATE = """
+        Execute the following task:
+
+        TASK: {desc}
+
+        Available tools: {tools}
+
+        Use a tool when it helps; otherwise respond with your analysis and
+        result directly.
+        """
+
+    def __init__(self, api_key: str, cache_threshold: float = 0.9):
         """
         Initialize the Executor with Gemini API access.
-        
+
         Args:
             api_key (str): Google API key for Gemini access
+            cache_threshold (float): Cosine similarity needed for a semantic cache hit
         """
         self.api_key = api_key
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_client(api_key)
         self.tools = {}
-        self.rag_system = SATKnowledgeRAG(api_key=api_key)
+        self._tools_desc = ""
+        self.rag_system = SATKnowledgeRAG(api_key=api_key, client=self.client)
+        self._semantic_cache = _SemanticCache(
+            self.rag_system._generate_query_embedding,
+            threshold=cache_threshold
+        )
+        # Proximity caches for the RAG tools: near-duplicate queries reuse
+        # earlier results without another vector-DB round trip. RAG context
+        # is approximate by nature, so a tight near-hit (cos >= 0.995,
+        # ~0.1 L2 on unit vectors) is acceptable.
+        self._search_cache = _SemanticCache(
+            self.rag_system._generate_query_embedding,
+            threshold=0.995, capacity=1000
+        )
+        self._context_cache = _SemanticCache(
+            self.rag_system._generate_query_embedding,
+            threshold=0.995, capacity=1000
+        )
+        # Memo shared by all tool calls within the currently running plan;
+        # None outside of plan execution
+        self._plan_tool_memo: Optional[Dict[Any, Any]] = None
+        # Generation config exposing the registered tools, rebuilt lazily
+        # after registration changes
+        self._gen_config: Optional[genai.types.GenerateContentConfig] = None
         self._register_default_tools()
-    
+
     def _register_default_tools(self):
         """Register built-in tools that the agent can use."""
         # Math and utility tools
@@ -47,32 +258,86 @@ class Executor:
             tool_func (Callable): The function to call when using this tool
         """
         self.tools[tool_name] = tool_func
-    
+        # Tool names change rarely, so the prompt fragment is kept current
+        # here rather than re-joined on every task
+        self._tools_desc = ", ".join(self.tools)
+        self._gen_config = None
+
+    def _memoized_tool(self, tool_name: str, tool_func: Callable) -> Callable:
+        """
+        Wrap a tool so identical calls within one plan reuse the first result.
+
+        Args:
+            tool_name (str): The registered name the model calls the tool by
+            tool_func (Callable): The underlying tool function
+
+        Returns:
+            Callable: The wrapped tool, named for function declaration
+        """
+        @functools.wraps(tool_func)
+        def wrapper(**parameters):
+            memo = self._plan_tool_memo
+            if memo is not None:
+                try:
+                    memo_key = (tool_name, json.dumps(parameters, sort_keys=True))
+                except TypeError:
+                    memo_key = None
+                if memo_key is not None:
+                    if memo_key not in memo:
+                        memo[memo_key] = tool_func(**parameters)
+                    return memo[memo_key]
+            return tool_func(**parameters)
+
+        # The SDK derives the function declaration name from __name__, which
+        # must match the registered tool name the prompt advertises
+        wrapper.__name__ = tool_name
+        wrapper.__qualname__ = tool_name
+        return wrapper
+
+    def _tool_config(self) -> genai.types.GenerateContentConfig:
+        """Return the generation config that declares the registered tools."""
+        if self._gen_config is None:
+            self._gen_config = genai.types.GenerateContentConfig(
+                tools=[self._memoized_tool(name, func) for name, func in self.tools.items()]
+            )
+        return self._gen_config
+
     def _calculator(self, expression: str) -> Dict[str, Any]:
         """Calculator tool for basic math operations."""
         try:
-            # For safety, only allow basic math operations
-            allowed_chars = set('0123456789+-*/()^. ')
-            if all(c in allowed_chars for c in expression.replace('**', '^')):
-                # Replace ^ with ** for Python
-                safe_expression = expression.replace('^', '**')
-                result = eval(safe_expression)
-                return {"status": "success", "result": result, "expression": expression}
-            else:
+            # Fast character screen in C before any parsing
+            if expression.translate(_CALC_TRANS):
                 return {"status": "error", "message": "Invalid characters in expression"}
+
+            # Replace ^ with ** for Python
+            # Strip padding: ast.parse rejects leading whitespace
+            safe_expression = expression.replace('^', '**').strip()
+            # AST whitelist validation + cached compile; evaluated with an
+            # empty builtins namespace
+            code = _compile_expr(safe_expression)
+            result = eval(code, {'__builtins__': {}}, {})
+            return {"status": "success", "result": result, "expression": expression}
+        except (ValueError, SyntaxError):
+            return {"status": "error", "message": "Invalid characters in expression"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
     def _search_knowledge_rag(self, query: str, subject: str = "all", max_results: int = 3) -> Dict[str, Any]:
         """Search the SAT knowledge base using RAG (semantic search)."""
         try:
+            # Proximity cache: a near-identical earlier query answers directly
+            cache_params = {"subject": subject, "max_results": max_results}
+            query_vector, cached = self._search_cache.lookup(query, cache_params)
+            if cached is not None:
+                return cached
+
             results = self.rag_system.search(
-                query=query, 
-                subject_filter=subject, 
+                query=query,
+                subject_filter=subject,
                 max_results=max_results
             )
-            
-            return {
+
+            response = {
                 "status": "success",
                 "query": query,
                 "subject_filter": subject,
@@ -80,116 +345,116 @@ class Executor:
                 "results": results,
                 "search_method": "RAG (semantic search)"
             }
+            self._search_cache.store(query, query_vector, response, cache_params)
+            return response
         except Exception as e:
             return {"status": "error", "message": str(e)}
-    
+
     def _get_context(self, query: str, subject: str = "all", max_context_length: int = 1500) -> Dict[str, Any]:
         """Get formatted context for a query using RAG."""
         try:
+            # Proximity cache: a near-identical earlier query answers directly
+            cache_params = {"subject": subject, "max_context_length": max_context_length}
+            query_vector, cached = self._context_cache.lookup(query, cache_params)
+            if cached is not None:
+                return cached
+
             context = self.rag_system.get_relevant_context(
                 query=query,
                 subject_filter=subject,
                 max_context_length=max_context_length
             )
-            
-            return {
+
+            response = {
                 "status": "success",
                 "query": query,
                 "subject_filter": subject,
                 "context": context,
                 "context_length": len(context)
             }
+            self._context_cache.store(query, query_vector, response, cache_params)
+            return response
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
     def execute_task(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Execute a single task using the LLM and available tools.
-        
+
+        Args:
+            task (Dict[str, Any]): The task to execute
+            context (Optional[Dict[str, Any]]): Additional context for execution
+
+        Returns:
+            Dict[str, Any]: The execution result
+        """
+        return asyncio.run(self._execute_task_async(task, context))
+
+    async def _execute_task_async(self, task: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async core of execute_task, using the Gemini async client so plan
+        execution can overlap independent tasks.
+
         Args:
             task (Dict[str, Any]): The task to execute
             context (Optional[Dict[str, Any]]): Additional context for execution
-            
+
         Returns:
             Dict[str, Any]: The execution result
         """
         if context is None:
             context = {}
-        
-        # Prepare prompt for the LLM with the task description and available tools
-        tools_description = ", ".join(self.tools.keys())
-        prompt = f"""
-        Execute the following task:
-        
-        TASK: {task['description']}
-        
-        Available tools: {tools_description}
-        
-        To use a tool, respond with JSON in the format:
-        {{
-            "tool": "tool_name",
-            "parameters": {{...}}
-        }}
-        
-        If no tool is needed, respond with your analysis and result directly.
-        """
-        
-        response = self.client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=prompt
-        )
-        
-        # Process the response to check if a tool needs to be called
+
+        # Semantic cache: repeated or paraphrased task descriptions return
+        # the stored result without touching the LLM
+        query_vector, cached_result = self._semantic_cache.lookup(task['description'])
+        if cached_result is not None:
+            return cached_result
+
+        # Render the precompiled prompt template with the per-task fields
+        prompt = self._TASK_TEMPLATE.format_map({
+            'desc': task['description'],
+            'tools': self._tools_desc
+        })
+
         try:
-            response_text = response.text
-            
-            # Check if the response is requesting a tool call
-            if "tool" in response_text.lower() and "{" in response_text:
-                # Extract the JSON part from the response
-                start_idx = response_text.find("{")
-                end_idx = response_text.rfind("}") + 1
-                json_str = response_text[start_idx:end_idx]
-                
-                try:
-                    tool_request = json.loads(json_str)
-                    tool_name = tool_request.get("tool")
-                    parameters = tool_request.get("parameters", {})
-                    
-                    if tool_name in self.tools:
-                        # Call the requested tool
-                        tool_result = self.tools[tool_name](**parameters)
-                        
-                        # Process the tool result with the LLM
-                        follow_up_prompt = f"""
-                        Tool: {tool_name}
-                        Result: {tool_result}
-                        
-                        Based on this result, complete the task:
-                        TASK: {task['description']}
-                        """
-                        
-                        follow_up_response = self.client.models.generate_content(
-                            model='gemini-2.0-flash-exp',
-                            contents=follow_up_prompt
-                        )
-                        return {
-                            "status": "success",
-                            "result": follow_up_response.text,
-                            "tool_used": tool_name,
-                            "tool_result": tool_result
-                        }
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, treat it as a direct response
-                    pass
-            
-            # If no tool call is detected or JSON parsing failed, return the direct response
-            return {
+            # Native function calling: the SDK runs the requested tool and
+            # returns the final text in a single round trip, replacing the
+            # old plan-tool-summarize double call. Streaming accumulates the
+            # text as it is generated instead of blocking on the full
+            # completion, so slow long answers start arriving immediately.
+            response_stream = await self.client.aio.models.generate_content_stream(
+                model='gemini-2.0-flash-exp',
+                contents=prompt,
+                config=self._tool_config()
+            )
+            text_parts = []
+            last_chunk = None
+            async for chunk in response_stream:
+                last_chunk = chunk
+                if chunk.text:
+                    text_parts.append(chunk.text)
+
+            # Recover which tool (if any) ran from the function calling history
+            tool_name = None
+            tool_result = None
+            history = getattr(last_chunk, 'automatic_function_calling_history', None) or []
+            for content in history:
+                for part in (content.parts or []):
+                    if getattr(part, 'function_call', None) is not None:
+                        tool_name = part.function_call.name
+                    if getattr(part, 'function_response', None) is not None:
+                        tool_result = part.function_response.response
+
+            execution_result = {
                 "status": "success",
-                "result": response_text,
-                "tool_used": None,
-                "tool_result": None
+                "result": "".join(text_parts),
+                "tool_used": tool_name,
+                "tool_result": tool_result
             }
-                
+            self._semantic_cache.store(task['description'], query_vector, execution_result)
+            return execution_result
+
         except Exception as e:
             print(f"Error executing task: {e}")
             return {
@@ -199,23 +464,71 @@ class Executor:
     
     def execute_plan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Execute a full plan of tasks in sequence, handling dependencies.
-        
+        Execute a full plan of tasks, handling dependencies.
+
         Args:
             plan (List[Dict[str, Any]]): The plan to execute
-            
+
         Returns:
             List[Dict[str, Any]]: The results of each task execution
         """
-        results = []
-        context = {}
-        
-        for task in plan:
-            # Execute each task and store results
-            task_result = self.execute_task(task, context)
-            results.append(task_result)
-            
-            # Update context with results for subsequent tasks
-            context[f"task_{len(results)}"] = task_result
-            
+        return asyncio.run(self.aexecute_plan(plan))
+
+    async def aexecute_plan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute a plan, running tasks without dependencies concurrently and
+        the rest in order.
+
+        Args:
+            plan (List[Dict[str, Any]]): The plan to execute
+
+        Returns:
+            List[Dict[str, Any]]: The results of each task execution, in plan order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(plan)
+        async for i, task_result in self.aexecute_plan_stream(plan):
+            results[i] = task_result
         return results
+
+    async def aexecute_plan_stream(self, plan: List[Dict[str, Any]]):
+        """
+        Execute a plan, yielding (index, result) pairs as tasks complete.
+
+        Tasks without dependencies are in flight concurrently and surface in
+        completion order; the rest run in plan order afterwards. Callers can
+        render each step as soon as it finishes instead of waiting for the
+        whole plan.
+
+        Args:
+            plan (List[Dict[str, Any]]): The plan to execute
+
+        Yields:
+            Tuple[int, Dict[str, Any]]: The task index and its result
+        """
+        done = set()
+        context = {}
+        # Plans often repeat the same tool call across tasks; memoize per
+        # plan so each distinct (tool, parameters) pair runs once
+        self._plan_tool_memo = {}
+
+        async def _run(i):
+            return i, await self._execute_task_async(plan[i], context)
+
+        try:
+            # Tasks with no declared dependencies can all be in flight at once,
+            # collapsing N serial LLM round trips into roughly one
+            independent = [i for i, task in enumerate(plan) if not task.get("dependencies")]
+            for future in asyncio.as_completed([_run(i) for i in independent]):
+                i, task_result = await future
+                done.add(i)
+                context[f"task_{i + 1}"] = task_result
+                yield i, task_result
+
+            # Remaining tasks run in order with the accumulated context
+            for i, task in enumerate(plan):
+                if i not in done:
+                    task_result = await self._execute_task_async(task, context)
+                    context[f"task_{i + 1}"] = task_result
+                    yield i, task_result
+        finally:
+            self._plan_tool_memo = None
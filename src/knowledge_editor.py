@@ -5,7 +5,11 @@ Allows browsing, editing, and saving SAT knowledge files with automatic embeddin
 """
 
 import streamlit as st
+import hashlib
+import mmap
+import numpy as np
 import os
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 import json
@@ -22,82 +26,186 @@ load_dotenv()
 KNOWLEDGE_BASE_PATH = "satKnowledge"
 API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Sidecar store of per-file content hashes, kept next to the vector DB so
+# saves with unchanged content can skip the embedding round trip
+HASH_STORE_PATH = Path("chroma_db") / ".content_hashes.json"
+
+def _content_hash(content):
+    """8-byte blake2b digest of content, used for fast change detection"""
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+def _load_hash_store():
+    """Load the path -> content hash sidecar; missing or corrupt means empty"""
+    try:
+        return json.loads(HASH_STORE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _save_hash_store(store):
+    """Persist the path -> content hash sidecar"""
+    try:
+        HASH_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        HASH_STORE_PATH.write_text(json.dumps(store))
+    except OSError as e:
+        st.warning(f"Could not persist content hashes: {e}")
+
 def initialize_systems():
     """Initialize the knowledge systems"""
     if 'knowledge_retriever' not in st.session_state:
         st.session_state.knowledge_retriever = KnowledgeRetriever(KNOWLEDGE_BASE_PATH)
-    
+
     if 'rag_system' not in st.session_state and API_KEY:
         st.session_state.rag_system = SATKnowledgeRAG(API_KEY, KNOWLEDGE_BASE_PATH)
+        _refresh_index_if_stale(st.session_state.rag_system)
+
+def _refresh_index_if_stale(rag_system):
+    """Rebuild the persisted index only when a markdown file is newer than it"""
+    watermark_path = Path("chroma_db") / ".last_build"
+    newest = _knowledge_tree_signature()
+    try:
+        if watermark_path.exists() and float(watermark_path.read_text()) >= newest:
+            return
+    except ValueError:
+        pass  # Unreadable watermark; rebuild to be safe
+    rag_system.rebuild_index()
+    watermark_path.parent.mkdir(exist_ok=True)
+    watermark_path.write_text(str(newest))
+
+def _advance_watermark():
+    """Record the current tree signature so a patched index isn't rebuilt"""
+    watermark_path = Path("chroma_db") / ".last_build"
+    try:
+        watermark_path.parent.mkdir(exist_ok=True)
+        watermark_path.write_text(str(_knowledge_tree_signature()))
+    except Exception as e:
+        print(f"Error updating index watermark: {e}")
+
+@dataclass(slots=True)
+class KnowledgeFiles:
+    """
+    Column-oriented listing of knowledge files.
+
+    Parallel lists keep per-file overhead to a handful of strings instead of
+    a dict per file; display names are built lazily for visible rows only.
+    """
+    paths: list
+    names: list
+    subjects: list
+    domains: list
+    skills: list
+    types: list
+
+    def __len__(self):
+        return len(self.paths)
+
+    def display_name(self, i):
+        """Build the display label for row i on demand"""
+        subject = self.subjects[i].title()
+        topic = Path(self.names[i]).stem.split('-')[-1].title()
+        if self.types[i] == 'subject':
+            return f"{subject} - {topic}"
+        domain = self.domains[i].replace('-', ' ').title()
+        if self.types[i] == 'domain':
+            return f"{subject} > {domain} - {topic}"
+        skill = self.skills[i].replace('-', ' ').title()
+        return f"{subject} > {domain} > {skill} - {topic}"
+
+    def entry(self, i):
+        """Materialize the dict form of row i for the editor pane"""
+        entry = {
+            'path': self.paths[i],
+            'relative_path': str(Path(self.paths[i]).relative_to(KNOWLEDGE_BASE_PATH)),
+            'subject': self.subjects[i],
+            'type': self.types[i],
+            'name': self.names[i],
+            'display_name': self.display_name(i)
+        }
+        if self.domains[i]:
+            entry['domain'] = self.domains[i]
+        if self.skills[i]:
+            entry['skill'] = self.skills[i]
+        return entry
+
+def _knowledge_tree_signature():
+    """Newest markdown mtime under the knowledge base, used as a cache key"""
+    return max((p.stat().st_mtime for p in Path(KNOWLEDGE_BASE_PATH).rglob('*.md')), default=0.0)
 
 def get_all_files():
     """Get all knowledge files organized by hierarchy"""
-    files = []
+    return _get_all_files_cached(_knowledge_tree_signature())
+
+@st.cache_data(ttl=60)
+def _filter_arrays(tree_signature):
+    """Subject/type columns as numpy arrays for vectorized sidebar filtering"""
+    files = _get_all_files_cached(tree_signature)
+    return (np.array(files.subjects, dtype=object),
+            np.array(files.types, dtype=object))
+
+@st.cache_data(ttl=60)
+def _get_all_files_cached(tree_signature):
+    """Cached body of get_all_files; re-runs only when the tree changes"""
     knowledge_path = Path(KNOWLEDGE_BASE_PATH)
-    
-    for subject_dir in knowledge_path.iterdir():
-        if subject_dir.is_dir() and subject_dir.name in ['math', 'english']:
-            subject = subject_dir.name
-            
-            # Add subject-level files
-            for file in subject_dir.iterdir():
-                if file.is_file() and file.suffix == '.md':
-                    files.append({
-                        'path': str(file),
-                        'relative_path': str(file.relative_to(knowledge_path)),
-                        'subject': subject,
-                        'type': 'subject',
-                        'name': file.name,
-                        'display_name': f"{subject.title()} - {file.stem.split('-')[-1].title()}"
-                    })
-            
-            # Add domain/topic files
-            for domain_dir in subject_dir.iterdir():
-                if domain_dir.is_dir():
-                    domain = domain_dir.name
-                    
-                    # Add domain-level files
-                    for file in domain_dir.iterdir():
-                        if file.is_file() and file.suffix == '.md':
-                            files.append({
-                                'path': str(file),
-                                'relative_path': str(file.relative_to(knowledge_path)),
-                                'subject': subject,
-                                'domain': domain,
-                                'type': 'domain',
-                                'name': file.name,
-                                'display_name': f"{subject.title()} > {domain.replace('-', ' ').title()} - {file.stem.split('-')[-1].title()}"
-                            })
-                    
-                    # Add skill-level files
-                    for skill_dir in domain_dir.iterdir():
-                        if skill_dir.is_dir():
-                            skill = skill_dir.name
-                            
-                            for file in skill_dir.iterdir():
-                                if file.is_file() and file.suffix == '.md':
-                                    files.append({
-                                        'path': str(file),
-                                        'relative_path': str(file.relative_to(knowledge_path)),
-                                        'subject': subject,
-                                        'domain': domain,
-                                        'skill': skill,
-                                        'type': 'skill',
-                                        'name': file.name,
-                                        'display_name': f"{subject.title()} > {domain.replace('-', ' ').title()} > {skill.replace('-', ' ').title()} - {file.stem.split('-')[-1].title()}"
-                                    })
-    
-    return sorted(files, key=lambda x: (x['subject'], x.get('domain', ''), x.get('skill', ''), x['name']))
+    rows = []
+
+    # One os.walk descent; hierarchy is parsed from the relative path
+    for root, dirs, filenames in os.walk(knowledge_path):
+        parts = Path(root).relative_to(knowledge_path).parts
+
+        if not parts:
+            # Top level: only descend into the subject directories
+            dirs[:] = [d for d in dirs if d in ('math', 'english')]
+            continue
+        if len(parts) > 3:
+            dirs[:] = []
+            continue
+
+        subject = parts[0]
+        domain = parts[1] if len(parts) > 1 else ''
+        skill = parts[2] if len(parts) > 2 else ''
+        file_type = ('subject', 'domain', 'skill')[len(parts) - 1]
+
+        for name in filenames:
+            if name.endswith('.md'):
+                rows.append((subject, domain, skill, name, file_type, os.path.join(root, name)))
+
+    rows.sort()
+
+    return KnowledgeFiles(
+        paths=[row[5] for row in rows],
+        names=[row[3] for row in rows],
+        subjects=[row[0] for row in rows],
+        domains=[row[1] for row in rows],
+        skills=[row[2] for row in rows],
+        types=[row[4] for row in rows],
+    )
 
 def load_file_content(file_path):
     """Load content from a file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return _load_file_content_cached(file_path, os.path.getmtime(file_path))
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return ""
 
+@st.cache_data(ttl=30)
+def _load_file_content_cached(file_path, mtime):
+    """Read the file through a read-only mmap; cached per (path, mtime)"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:].decode('utf-8')
+
+@st.cache_data(show_spinner=False)
+def _render_md(md_hash, md):
+    """Render markdown to HTML once per content hash"""
+    import markdown
+    return markdown.markdown(md, extensions=['fenced_code', 'tables'])
+
+def render_preview(content):
+    """Show a rendered markdown preview, reusing the cached HTML when unchanged"""
+    st.components.v1.html(_render_md(hash(content), content), height=600, scrolling=True)
+
 def save_file_content(file_path, content):
     """Save content to a file"""
     try:
@@ -112,9 +220,24 @@ def update_embedding(file_path):
     """Update embedding for a file"""
     if API_KEY and 'rag_system' in st.session_state:
         try:
-            # Rebuild the entire index for now (could be optimized to update just one file)
-            st.session_state.rag_system.rebuild_index()
-            return True
+            # Skip the embedding round trip when the stored hash shows the
+            # content has not actually changed
+            content_hash = _content_hash(load_file_content(file_path))
+            store = _load_hash_store()
+            key = str(file_path)
+            if store.get(key) == content_hash:
+                return True
+
+            # Re-embed just the edited file and patch the collection in place
+            if st.session_state.rag_system.upsert_file(file_path):
+                store[key] = content_hash
+                _save_hash_store(store)
+                # The collection is already patched; move the watermark so
+                # the next app start doesn't see this edit as stale and
+                # trigger a full rebuild
+                _advance_watermark()
+                return True
+            return False
         except Exception as e:
             st.error(f"Error updating embedding: {e}")
             return False
@@ -122,6 +245,11 @@ def update_embedding(file_path):
 
 def get_file_stats():
     """Get statistics about the knowledge base"""
+    return _get_file_stats_cached(_knowledge_tree_signature())
+
+@st.cache_data(ttl=60)
+def _get_file_stats_cached(tree_signature):
+    """Cached body of get_file_stats; re-runs only when the tree changes"""
     stats = {'total_files': 0, 'subjects': {}}
     
     for subject in ['math', 'english']:
@@ -166,28 +294,30 @@ def main():
         files = get_all_files()
         
         # Filter options
-        subjects = ['All'] + list(set(f['subject'] for f in files))
+        subjects = ['All'] + sorted(set(files.subjects))
         selected_subject = st.selectbox("Filter by Subject", subjects)
-        
-        file_types = ['All'] + list(set(f['type'] for f in files))
+
+        file_types = ['All'] + sorted(set(files.types))
         selected_type = st.selectbox("Filter by Type", file_types)
-        
-        # Filter files
-        filtered_files = files
+
+        # Filter with numpy boolean masks over the column arrays
+        subjects_arr, types_arr = _filter_arrays(_knowledge_tree_signature())
+        mask = np.ones(len(files), dtype=bool)
         if selected_subject != 'All':
-            filtered_files = [f for f in filtered_files if f['subject'] == selected_subject]
+            mask &= subjects_arr == selected_subject
         if selected_type != 'All':
-            filtered_files = [f for f in filtered_files if f['type'] == selected_type]
-        
-        # File selection
-        if filtered_files:
-            file_options = [f['display_name'] for f in filtered_files]
+            mask &= types_arr == selected_type
+        visible_idx = np.flatnonzero(mask)
+
+        # File selection (display names built only for visible rows)
+        if visible_idx.size:
+            file_options = [files.display_name(i) for i in visible_idx]
             selected_file_idx = st.selectbox(
                 "Select File to Edit",
                 range(len(file_options)),
                 format_func=lambda i: file_options[i]
             )
-            selected_file = filtered_files[selected_file_idx]
+            selected_file = files.entry(visible_idx[selected_file_idx])
         else:
             st.warning("No files found matching the filters")
             selected_file = None
@@ -285,10 +415,10 @@ def main():
                     disabled=True
                 )
                 st.markdown("### Rendered Preview:")
-                st.markdown(edited_content)
+                render_preview(edited_content)
             else:
                 # Show current file content
-                st.markdown(current_content)
+                render_preview(current_content)
     
     else:
         # Welcome screen
@@ -5,12 +5,78 @@ This module handles searching, retrieving, and processing content from the
 structured SAT knowledge base stored in markdown files.
 """
 
+import collections
+import functools
+import hashlib
+import heapq
+import itertools
 import os
 import json
+import math
+import pickle
 import re
+import sys
+import numpy as np
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
 from pathlib import Path
 
+# Compiled once at import; used for every file parsed and every query
+_HEADER_RE = re.compile(r"^#{1,6}[^\n]*$", re.M)
+_TOKEN_RE = re.compile(r"\w+")
+
+@dataclass(slots=True)
+class SearchResult:
+    """A single search hit; slots avoid a per-instance __dict__."""
+    subject: str
+    type: str
+    title: str
+    file_path: str
+    relevance_score: float
+    topic: Optional[str] = None
+    subtopic: Optional[str] = None
+    content: str = ""
+
+@dataclass(slots=True)
+class DocMeta:
+    """Flat per-document record used by the search hot path."""
+    subject: str
+    topic: Optional[str]
+    subtopic: Optional[str]
+    type: str
+    title: str
+    file_path: str
+    doc_length: int
+    tf: Dict[str, int]
+
+# Buffer size for streamed reads/writes; the 8 KiB io default is sized
+# for much older hardware
+_READ_BUF = 1 << 17
+
+@functools.lru_cache(maxsize=4096)
+def _stem(token: str) -> str:
+    """
+    Normalize plural forms so 'equations' matches 'equation'.
+
+    A conservative plural-only stemmer: unlike ing/ed stripping it never
+    maps a base form and its inflection to different stems, so recall
+    improves without surprising misses.
+    """
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")) and len(token) > 3:
+        token = token[:-1]
+    return sys.intern(token)
+
+@functools.lru_cache(maxsize=256)
+def _tokenize_query(query: str) -> Tuple[str, ...]:
+    """Tokenize a query in one regex pass; repeated queries hit the cache."""
+    return tuple(_stem(token) for token in _TOKEN_RE.findall(query.lower()))
+
 class KnowledgeRetriever:
     """
     Knowledge retriever that can search through the SAT knowledge base
@@ -25,20 +91,189 @@ class KnowledgeRetriever:
             knowledge_base_path (str): Path to the SAT knowledge base directory
         """
         self.knowledge_base_path = Path(knowledge_base_path)
+        self.cache_path = self.knowledge_base_path / ".index_cache.pkl"
         self.knowledge_index = {}
-        self._build_knowledge_index()
-    
+        self.docs = []
+        self.postings = {}
+        self.by_key = {}
+        self.idf = {}
+        self.avgdl = 0.0
+        self._len_norm = []
+        # Memoized search results, keyed by (query, subject_filter, max_results)
+        self._result_cache = {}
+        # A pickled index whose fingerprint still matches the tree skips
+        # the whole walk-and-parse on startup
+        if not self._load_cached_index():
+            self._build_knowledge_index()
+            self._save_index_cache()
+
+    def _index_fingerprint(self) -> str:
+        """Hash of every source file's path and mtime, used to validate the cache."""
+        files = itertools.chain(
+            self.knowledge_base_path.rglob("*.md"),
+            self.knowledge_base_path.rglob("metadata.json")
+        )
+        stats = {str(p): p.stat().st_mtime_ns for p in sorted(files)}
+        return hashlib.blake2b(json.dumps(stats).encode()).hexdigest()
+
+    def _load_cached_index(self) -> bool:
+        """Load the pickled index if its fingerprint still matches the tree."""
+        try:
+            if not self.cache_path.exists():
+                return False
+            with open(self.cache_path, "rb", buffering=_READ_BUF) as f:
+                cached = pickle.load(f)
+            if cached.get("fingerprint") != self._index_fingerprint():
+                return False
+            self.knowledge_index = cached["index"]
+            self.docs = cached["docs"]
+            self.postings = cached["postings"]
+            self.by_key = cached["by_key"]
+            self.idf = cached["idf"]
+            self.avgdl = cached["avgdl"]
+            self._compute_length_norms()
+            return True
+        except Exception as e:
+            print(f"Error loading index cache: {e}")
+            return False
+
+    def _save_index_cache(self):
+        """Persist the built index so later startups skip the rebuild."""
+        try:
+            with open(self.cache_path, "wb", buffering=_READ_BUF) as f:
+                pickle.dump({
+                    "fingerprint": self._index_fingerprint(),
+                    "index": self.knowledge_index,
+                    "docs": self.docs,
+                    "postings": self.postings,
+                    "by_key": self.by_key,
+                    "idf": self.idf,
+                    "avgdl": self.avgdl
+                }, f, protocol=5)
+        except Exception as e:
+            print(f"Error saving index cache: {e}")
+
     def _build_knowledge_index(self):
         """Build an index of all knowledge base content for faster searching."""
         try:
+            self._prefetch_files()
             self.knowledge_index = {
                 "math": self._index_subject("math"),
                 "english": self._index_subject("english")
             }
+            self._build_docs()
+            self._compute_bm25_stats()
+            self._parsed = {}
         except Exception as e:
             print(f"Error building knowledge index: {e}")
             self.knowledge_index = {"math": {}, "english": {}}
-    
+            self.docs = []
+            self.postings = {}
+            self.by_key = {}
+            self.idf = {}
+            self.avgdl = 0.0
+            self._len_norm = []
+
+    def _prefetch_files(self):
+        """Parse every source file up front; the reads are I/O-bound, so a
+        thread pool overlaps them instead of opening files one at a time."""
+        md_paths = list(self.knowledge_base_path.rglob("*.md"))
+        json_paths = list(self.knowledge_base_path.rglob("metadata.json"))
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            md_entries = list(pool.map(self._read_markdown_file, md_paths))
+            json_entries = list(pool.map(self._read_json_file, json_paths))
+        self._parsed = {str(path): entry for path, entry in zip(md_paths, md_entries)}
+        self._parsed.update(zip(map(str, json_paths), json_entries))
+
+    def _parsed_entry(self, file_path):
+        """Return the prefetched parse for a path, reading directly as a fallback."""
+        entry = self._parsed.get(str(file_path))
+        if entry is None:
+            if str(file_path).endswith('.md'):
+                entry = self._read_markdown_file(file_path)
+            else:
+                entry = self._read_json_file(file_path)
+        return entry
+
+    def _iter_docs(self):
+        """Yield (metadata, entry) pairs for every indexed markdown file."""
+        for subject, subject_index in self.knowledge_index.items():
+            if subject_index.get("overview"):
+                yield {"subject": subject, "type": "overview",
+                       "title": f"{subject.capitalize()} Overview"}, subject_index["overview"]
+            if subject_index.get("study_notes"):
+                yield {"subject": subject, "type": "study_notes",
+                       "title": f"{subject.capitalize()} Study Notes"}, subject_index["study_notes"]
+            for topic_name, topic_data in subject_index.get("topics", {}).items():
+                topic_title = topic_name.replace('-', ' ').title()
+                if topic_data.get("overview"):
+                    yield {"subject": subject, "topic": topic_name, "type": "topic_overview",
+                           "title": f"{topic_title} Overview"}, topic_data["overview"]
+                if topic_data.get("study_notes"):
+                    yield {"subject": subject, "topic": topic_name, "type": "topic_notes",
+                           "title": f"{topic_title} Study Notes"}, topic_data["study_notes"]
+                for subtopic_name, subtopic_data in topic_data.get("subtopics", {}).items():
+                    subtopic_title = subtopic_name.replace('-', ' ').title()
+                    if subtopic_data.get("overview"):
+                        yield {"subject": subject, "topic": topic_name, "subtopic": subtopic_name,
+                               "type": "subtopic_overview",
+                               "title": f"{subtopic_title} Overview"}, subtopic_data["overview"]
+                    if subtopic_data.get("study_notes"):
+                        yield {"subject": subject, "topic": topic_name, "subtopic": subtopic_name,
+                               "type": "subtopic_notes",
+                               "title": f"{subtopic_title} Study Notes"}, subtopic_data["study_notes"]
+
+    def _build_docs(self):
+        """Flatten indexed files into a doc table plus an inverted index."""
+        self.docs = []
+        self.postings = {}
+        self.by_key = {}
+        for meta, entry in self._iter_docs():
+            doc_id = len(self.docs)
+            doc = DocMeta(
+                subject=meta["subject"],
+                topic=meta.get("topic"),
+                subtopic=meta.get("subtopic"),
+                type=meta["type"],
+                title=meta["title"],
+                file_path=entry["file_path"],
+                doc_length=entry["doc_length"],
+                tf=entry["tf"],
+            )
+            self.docs.append(doc)
+            self.by_key[(doc.subject, doc.topic, doc.subtopic, doc.type)] = doc_id
+            for term, term_tf in entry["tf"].items():
+                self.postings.setdefault(term, []).append((doc_id, term_tf))
+
+    def _compute_bm25_stats(self):
+        """Compute corpus-wide IDF and average document length for BM25."""
+        doc_count = len(self.docs)
+        total_length = sum(doc.doc_length for doc in self.docs)
+        self.avgdl = (total_length / doc_count) if doc_count else 0.0
+
+        # Document frequency is just the posting list length
+        self.idf = {
+            term: math.log((doc_count - len(posting) + 0.5) / (len(posting) + 0.5) + 1)
+            for term, posting in self.postings.items()
+        }
+
+        # Convert the posting lists to parallel numpy arrays so scoring is
+        # one vectorized update per query term instead of a Python loop
+        self.postings = {
+            term: (np.fromiter((d for d, _ in posting), np.int32, len(posting)),
+                   np.fromiter((t for _, t in posting), np.float32, len(posting)))
+            for term, posting in self.postings.items()
+        }
+        self._compute_length_norms()
+
+    def _compute_length_norms(self):
+        """Precompute the per-document BM25 length normalization terms."""
+        if self.avgdl:
+            doc_lengths = np.fromiter((doc.doc_length for doc in self.docs), np.float32, len(self.docs))
+            self._len_norm = self._BM25_K1 * (1 - self._BM25_B + self._BM25_B * doc_lengths / self.avgdl)
+        else:
+            self._len_norm = np.zeros(0, dtype=np.float32)
+
     def _index_subject(self, subject: str) -> Dict[str, Any]:
         """
         Index all content for a specific subject (math or english).
@@ -62,17 +297,19 @@ class KnowledgeRetriever:
         # Index main subject files
         overview_file = subject_path / f"{subject}-overview.md"
         if overview_file.exists():
-            subject_index["overview"] = self._read_markdown_file(overview_file)
+            subject_index["overview"] = self._parsed_entry(overview_file)
         
         study_notes_file = subject_path / f"{subject}-study-notes.md"
         if study_notes_file.exists():
-            subject_index["study_notes"] = self._read_markdown_file(study_notes_file)
+            subject_index["study_notes"] = self._parsed_entry(study_notes_file)
         
-        # Index all topics and subtopics
-        for topic_dir in subject_path.iterdir():
-            if topic_dir.is_dir():
-                topic_name = topic_dir.name
-                subject_index["topics"][topic_name] = self._index_topic(topic_dir, topic_name)
+        # Index all topics and subtopics; scandir DirEntry objects carry
+        # cached type info from the directory read, avoiding per-child stats
+        with os.scandir(subject_path) as it:
+            for child in it:
+                if child.is_dir(follow_symlinks=False):
+                    topic_name = child.name
+                    subject_index["topics"][topic_name] = self._index_topic(Path(child.path), topic_name)
         
         return subject_index
     
@@ -95,18 +332,19 @@ class KnowledgeRetriever:
         }
         
         # Index main topic files
-        for file in topic_path.iterdir():
-            if file.is_file():
-                if file.name.endswith("-overview.md"):
-                    topic_index["overview"] = self._read_markdown_file(file)
-                elif file.name.endswith("-study-notes.md"):
-                    topic_index["study_notes"] = self._read_markdown_file(file)
-                elif file.name == "metadata.json":
-                    topic_index["metadata"] = self._read_json_file(file)
-            elif file.is_dir():
-                # This is a subtopic
-                subtopic_name = file.name
-                topic_index["subtopics"][subtopic_name] = self._index_subtopic(file, subtopic_name)
+        with os.scandir(topic_path) as it:
+            for file in it:
+                if file.is_file(follow_symlinks=False):
+                    if file.name.endswith("-overview.md"):
+                        topic_index["overview"] = self._parsed_entry(file.path)
+                    elif file.name.endswith("-study-notes.md"):
+                        topic_index["study_notes"] = self._parsed_entry(file.path)
+                    elif file.name == "metadata.json":
+                        topic_index["metadata"] = self._parsed_entry(file.path)
+                elif file.is_dir(follow_symlinks=False):
+                    # This is a subtopic
+                    subtopic_name = file.name
+                    topic_index["subtopics"][subtopic_name] = self._index_subtopic(Path(file.path), subtopic_name)
         
         return topic_index
     
@@ -127,14 +365,15 @@ class KnowledgeRetriever:
             "metadata": None
         }
         
-        for file in subtopic_path.iterdir():
-            if file.is_file():
-                if file.name.endswith("-overview.md"):
-                    subtopic_index["overview"] = self._read_markdown_file(file)
-                elif file.name.endswith("-study-notes.md"):
-                    subtopic_index["study_notes"] = self._read_markdown_file(file)
-                elif file.name == "metadata.json":
-                    subtopic_index["metadata"] = self._read_json_file(file)
+        with os.scandir(subtopic_path) as it:
+            for file in it:
+                if file.is_file(follow_symlinks=False):
+                    if file.name.endswith("-overview.md"):
+                        subtopic_index["overview"] = self._parsed_entry(file.path)
+                    elif file.name.endswith("-study-notes.md"):
+                        subtopic_index["study_notes"] = self._parsed_entry(file.path)
+                    elif file.name == "metadata.json":
+                        subtopic_index["metadata"] = self._parsed_entry(file.path)
         
         return subtopic_index
     
@@ -149,18 +388,28 @@ class KnowledgeRetriever:
             Dict[str, Any]: Parsed markdown content
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
+            # Whole-file read without BufferedIO/text-wrapper setup
+            content = Path(file_path).read_bytes().decode("utf-8")
+
+            # Tokenize once at index time; BM25 scoring only needs the term
+            # frequencies and document length afterwards
+            # Stemmed, interned tokens: plural forms collapse to one term
+            # and the tf/postings dict lookups stay identity-fast
+            tokens = [_stem(token) for token in _TOKEN_RE.findall(content.lower())]
+
+            # Content itself is not kept in RAM; search re-reads it on
+            # demand for just the returned results
             return {
                 "file_path": str(file_path),
-                "content": content,
                 "word_count": len(content.split()),
+                "doc_length": len(tokens),
+                "tf": collections.Counter(tokens),
                 "sections": self._extract_sections(content)
             }
         except Exception as e:
             print(f"Error reading markdown file {file_path}: {e}")
-            return {"file_path": str(file_path), "content": "", "word_count": 0, "sections": []}
+            return {"file_path": str(file_path), "word_count": 0,
+                    "doc_length": 0, "tf": collections.Counter(), "sections": []}
     
     def _read_json_file(self, file_path: Path) -> Dict[str, Any]:
         """
@@ -173,8 +422,7 @@ class KnowledgeRetriever:
             Dict[str, Any]: Parsed JSON content
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return json.loads(Path(file_path).read_bytes())
         except Exception as e:
             print(f"Error reading JSON file {file_path}: {e}")
             return {}
@@ -189,29 +437,27 @@ class KnowledgeRetriever:
         Returns:
             List[Dict[str, str]]: List of sections with headers and content
         """
+        # One regex pass over the content; each section body is a single
+        # slice between successive headers instead of per-line concatenation
+        matches = list(_HEADER_RE.finditer(markdown_content))
         sections = []
-        lines = markdown_content.split('\n')
-        current_section = {"header": "", "content": ""}
-        
-        for line in lines:
-            if line.startswith('#'):
-                # New section found
-                if current_section["content"].strip():
-                    sections.append(current_section.copy())
-                current_section = {
-                    "header": line.strip(),
-                    "content": ""
-                }
-            else:
-                current_section["content"] += line + "\n"
-        
-        # Add the last section
-        if current_section["content"].strip():
-            sections.append(current_section)
-        
+
+        # Anything before the first header keeps the old headerless shape
+        lead_end = matches[0].start() if matches else len(markdown_content)
+        lead = markdown_content[:lead_end]
+        if lead.strip():
+            sections.append({"header": "", "content": lead})
+
+        for i, match in enumerate(matches):
+            body_start = match.end() + 1  # skip the newline after the header
+            body_end = matches[i + 1].start() if i + 1 < len(matches) else len(markdown_content)
+            body = markdown_content[body_start:body_end]
+            if body.strip():
+                sections.append({"header": match.group(0).strip(), "content": body})
+
         return sections
     
-    def search_knowledge_base(self, query: str, subject_filter: str = "all", max_results: int = 5) -> List[Dict[str, Any]]:
+    def search_knowledge_base(self, query: str, subject_filter: str = "all", max_results: int = 5) -> List[SearchResult]:
         """
         Search the knowledge base for relevant content.
         
@@ -221,204 +467,88 @@ class KnowledgeRetriever:
             max_results (int): Maximum number of results to return
             
         Returns:
-            List[Dict[str, Any]]: List of relevant knowledge base entries
-        """
-        results = []
-        query_lower = query.lower()
-        
-        # Determine which subjects to search
-        subjects_to_search = []
-        if subject_filter == "all":
-            subjects_to_search = ["math", "english"]
-        elif subject_filter in ["math", "english"]:
-            subjects_to_search = [subject_filter]
-        
-        for subject in subjects_to_search:
-            if subject in self.knowledge_index:
-                subject_results = self._search_subject(query_lower, subject, self.knowledge_index[subject])
-                results.extend(subject_results)
-        
-        # Sort results by relevance score and return top results
-        results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
-        return results[:max_results]
-    
-    def _search_subject(self, query: str, subject: str, subject_index: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Search within a specific subject.
-        
-        Args:
-            query (str): The search query (lowercase)
-            subject (str): The subject being searched
-            subject_index (Dict[str, Any]): The subject's index
-            
-        Returns:
-            List[Dict[str, Any]]: List of relevant results from this subject
-        """
-        results = []
-        
-        # Search main subject files
-        if subject_index.get("overview"):
-            score = self._calculate_relevance_score(query, subject_index["overview"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "type": "overview",
-                    "title": f"{subject.capitalize()} Overview",
-                    "content": subject_index["overview"]["content"],
-                    "file_path": subject_index["overview"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        if subject_index.get("study_notes"):
-            score = self._calculate_relevance_score(query, subject_index["study_notes"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "type": "study_notes",
-                    "title": f"{subject.capitalize()} Study Notes",
-                    "content": subject_index["study_notes"]["content"],
-                    "file_path": subject_index["study_notes"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        # Search topics and subtopics
-        for topic_name, topic_data in subject_index.get("topics", {}).items():
-            topic_results = self._search_topic(query, subject, topic_name, topic_data)
-            results.extend(topic_results)
-        
-        return results
-    
-    def _search_topic(self, query: str, subject: str, topic_name: str, topic_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Search within a specific topic.
-        
-        Args:
-            query (str): The search query (lowercase)
-            subject (str): The subject name
-            topic_name (str): The topic name
-            topic_data (Dict[str, Any]): The topic's indexed data
-            
-        Returns:
-            List[Dict[str, Any]]: List of relevant results from this topic
-        """
-        results = []
-        
-        # Search topic files
-        if topic_data.get("overview"):
-            score = self._calculate_relevance_score(query, topic_data["overview"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "topic": topic_name,
-                    "type": "topic_overview",
-                    "title": f"{topic_name.replace('-', ' ').title()} Overview",
-                    "content": topic_data["overview"]["content"],
-                    "file_path": topic_data["overview"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        if topic_data.get("study_notes"):
-            score = self._calculate_relevance_score(query, topic_data["study_notes"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "topic": topic_name,
-                    "type": "topic_notes",
-                    "title": f"{topic_name.replace('-', ' ').title()} Study Notes",
-                    "content": topic_data["study_notes"]["content"],
-                    "file_path": topic_data["study_notes"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        # Search subtopics
-        for subtopic_name, subtopic_data in topic_data.get("subtopics", {}).items():
-            subtopic_results = self._search_subtopic(query, subject, topic_name, subtopic_name, subtopic_data)
-            results.extend(subtopic_results)
-        
-        return results
-    
-    def _search_subtopic(self, query: str, subject: str, topic_name: str, subtopic_name: str, subtopic_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Search within a specific subtopic.
-        
-        Args:
-            query (str): The search query (lowercase)
-            subject (str): The subject name
-            topic_name (str): The topic name
-            subtopic_name (str): The subtopic name
-            subtopic_data (Dict[str, Any]): The subtopic's indexed data
-            
-        Returns:
-            List[Dict[str, Any]]: List of relevant results from this subtopic
+            List[SearchResult]: List of relevant knowledge base entries
         """
+        if not self.avgdl:
+            return []
+
+        # Identical searches return the memoized result list outright
+        cache_key = (query, subject_filter, max_results)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Tokenize the query the same way documents were tokenized at index
+        # time; the cached helper makes repeated queries free
+        query_tokens = _tokenize_query(query)
+
+        k1 = self._BM25_K1
+        # Hoist instance attributes to locals outside the hot loops
+        idf_map = self.idf
+        postings = self.postings
+        len_norm = self._len_norm
+        docs = self.docs
+
+        # Union the posting lists: only documents containing at least one
+        # query term are ever visited, and each term's whole posting list
+        # is scored in one vectorized update
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term in query_tokens:
+            idf = idf_map.get(term)
+            if not idf:
+                continue
+            doc_ids, term_tfs = postings[term]
+            scores[doc_ids] += idf * (term_tfs * (k1 + 1)) / (term_tfs + len_norm[doc_ids])
+
         results = []
-        
-        if subtopic_data.get("overview"):
-            score = self._calculate_relevance_score(query, subtopic_data["overview"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "topic": topic_name,
-                    "subtopic": subtopic_name,
-                    "type": "subtopic_overview",
-                    "title": f"{subtopic_name.replace('-', ' ').title()} Overview",
-                    "content": subtopic_data["overview"]["content"],
-                    "file_path": subtopic_data["overview"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        if subtopic_data.get("study_notes"):
-            score = self._calculate_relevance_score(query, subtopic_data["study_notes"]["content"])
-            if score > 0:
-                results.append({
-                    "subject": subject,
-                    "topic": topic_name,
-                    "subtopic": subtopic_name,
-                    "type": "subtopic_notes",
-                    "title": f"{subtopic_name.replace('-', ' ').title()} Study Notes",
-                    "content": subtopic_data["study_notes"]["content"],
-                    "file_path": subtopic_data["study_notes"]["file_path"],
-                    "relevance_score": score
-                })
-        
-        return results
-    
-    def _calculate_relevance_score(self, query: str, content: str) -> float:
+        for doc_id in np.flatnonzero(scores):
+            score = float(scores[doc_id])
+            doc = docs[doc_id]
+            if subject_filter != "all" and doc.subject != subject_filter:
+                continue
+            results.append(SearchResult(
+                subject=doc.subject,
+                type=doc.type,
+                title=doc.title,
+                file_path=doc.file_path,
+                relevance_score=score,
+                topic=doc.topic,
+                subtopic=doc.subtopic,
+            ))
+
+        # Select the top results without sorting the whole candidate list
+        top_results = heapq.nlargest(max_results, results, key=attrgetter("relevance_score"))
+
+        # Load content lazily, only for the results actually returned
+        for result in top_results:
+            result.content = self._load_content(result.file_path)
+
+        if len(self._result_cache) > 256:
+            self._result_cache.clear()
+        self._result_cache[cache_key] = top_results
+
+        return top_results
+
+    # Standard BM25 parameters
+    _BM25_K1 = 1.5
+    _BM25_B = 0.75
+
+    def _load_content(self, file_path: str) -> str:
         """
-        Calculate a simple relevance score for content based on query.
-        
+        Read a file's full text on demand.
+
         Args:
-            query (str): The search query (lowercase)
-            content (str): The content to score
-            
+            file_path (str): Path to the markdown file
+
         Returns:
-            float: Relevance score (higher is more relevant)
+            str: The file content, or an empty string on failure
         """
-        if not content:
-            return 0.0
-        
-        content_lower = content.lower()
-        query_words = query.split()
-        
-        score = 0.0
-        total_words = len(content.split())
-        
-        # Count exact query matches (higher weight)
-        exact_matches = content_lower.count(query)
-        score += exact_matches * 10
-        
-        # Count individual word matches
-        for word in query_words:
-            if len(word) > 2:  # Ignore very short words
-                word_matches = content_lower.count(word)
-                score += word_matches * 2
-        
-        # Normalize by content length to favor more focused content
-        if total_words > 0:
-            score = score / (total_words / 100)  # Normalize per 100 words
-        
-        return score
-    
+        try:
+            return Path(file_path).read_bytes().decode("utf-8")
+        except Exception as e:
+            print(f"Error reading markdown file {file_path}: {e}")
+            return ""
+
     def get_topic_content(self, subject: str, topic: str, subtopic: str = None) -> Optional[Dict[str, Any]]:
         """
         Get specific content for a topic or subtopic.
@@ -444,13 +574,43 @@ class KnowledgeRetriever:
             if subtopic:
                 if subtopic not in topic_data.get("subtopics", {}):
                     return None
-                return topic_data["subtopics"][subtopic]
+                return self._hydrate_index_entry(topic_data["subtopics"][subtopic])
             else:
-                return topic_data
+                return self._hydrate_index_entry(topic_data)
                 
         except Exception as e:
             print(f"Error getting topic content: {e}")
             return None
+
+    def _hydrate_index_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return a copy of an index entry with file contents loaded.
+
+        The index itself keeps only term statistics in RAM; callers of
+        get_topic_content expect the actual text, so the markdown entries
+        (overview, study notes, and any subtopics) get a "content" field
+        read on demand — the same lazy load search_knowledge_base does
+        for its top results. The stored index is left untouched.
+
+        Args:
+            data (Dict[str, Any]): A topic or subtopic index entry
+
+        Returns:
+            Dict[str, Any]: A hydrated copy of the entry
+        """
+        hydrated = dict(data)
+        for key in ("overview", "study_notes"):
+            entry = hydrated.get(key)
+            if entry and "file_path" in entry:
+                entry = dict(entry)
+                entry["content"] = self._load_content(entry["file_path"])
+                hydrated[key] = entry
+        if hydrated.get("subtopics"):
+            hydrated["subtopics"] = {
+                name: self._hydrate_index_entry(sub)
+                for name, sub in hydrated["subtopics"].items()
+            }
+        return hydrated
     
     def get_all_topics(self, subject: str = "all") -> Dict[str, List[str]]:
         """
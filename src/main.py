@@ -6,16 +6,149 @@ Two-tab interface:
 2. Knowledge Base Q&A - Answer questions using SAT study materials
 """
 
+import asyncio
+import collections
+import itertools
 import os
+import re
 import streamlit as st
 from dotenv import load_dotenv
 from planner import Planner
-from executor import Executor
+from executor import Executor, _SemanticCache
 from memory import Memory
 
 # Load environment variables
 load_dotenv()
 
+# Planner prompt templates built once at import; only the per-question
+# fields are interpolated at call time. The invariant instruction blocks
+# lead and the dynamic fields trail so every request to a given method
+# shares a byte-identical prefix, which the Gemini endpoint's prompt
+# caching can reuse for prefill
+_SOLVE_PLAN_TEMPLATE = """
+            Solve the SAT question given at the end step by step.
+            
+            Create a detailed plan that:
+            1. Identifies what type of SAT question this is (math/english subtype)
+            2. If helpful, searches knowledge base for relevant strategies using search_knowledge tool
+            3. Breaks down the solution into clear, logical steps
+            4. Explains the reasoning and strategy for each step
+            5. Shows all work for math problems or analysis for english
+            6. Provides the final answer with confidence explanation
+            
+            Available knowledge base tools if needed:
+            - search_knowledge(query, subject="all", max_results=3): Semantic search using RAG
+            - get_context(query, subject="all"): Get formatted context for concepts
+            - calculator(expression): Perform calculations
+            
+            Make this educational - explain WHY each step is taken.
+            
+            Question: {question}
+            Question Type: {question_type}
+            """
+
+_PROBLEM_QA_TEMPLATE = """
+            Answer the question about the specific SAT problem and solution given at the end.
+            
+            Create a plan that:
+            1. Analyzes the original problem and provided explanation
+            2. Identifies what specific aspect the user is asking about
+            3. Provides a clear, educational answer based on the context
+            4. References specific parts of the problem or explanation as needed
+            5. Offers additional insights or alternative approaches if relevant
+            
+            Make this helpful for understanding the specific problem and solution provided.
+            
+            ORIGINAL PROBLEM: {problem_context}
+            
+            PROVIDED ANSWER/EXPLANATION: {answer_context}
+            
+            USER'S QUESTION: {question}
+            """
+
+_KNOWLEDGE_QA_TEMPLATE = """
+            Answer the question about SAT concepts given at the end using available study materials.
+            
+            Create a plan that:
+            1. Identifies which SAT topics/concepts are relevant to this question
+            2. Searches the knowledge base for relevant study materials using search_knowledge tool
+            3. Retrieves specific topic content if needed using get_topic_content tool
+            4. Synthesizes information from multiple sources
+            5. Provides a comprehensive, educational answer with citations
+            
+            Available knowledge base tools:
+            - search_knowledge(query, subject="all", max_results=3): Semantic search using RAG
+            - get_context(query, subject="all", max_context_length=1500): Get formatted context
+            
+            Make this helpful for SAT preparation - include examples and tips where relevant.
+            
+            Question: {question}
+            Topic Focus: {topic_focus}
+            """
+
+# Stripped planner prompt for questions that are pure arithmetic; it
+# omits the knowledge-base steps and tools entirely
+_SOLVE_MATH_ONLY_TEMPLATE = """
+            Solve the SAT math question given at the end step by step.
+            
+            Create a detailed plan that:
+            1. Breaks down the solution into clear, logical steps
+            2. Explains the reasoning and strategy for each step
+            3. Shows all work
+            4. Provides the final answer with confidence explanation
+            
+            Available tools if needed:
+            - calculator(expression): Perform calculations
+            
+            Make this educational - explain WHY each step is taken.
+            
+            Question: {question}
+            Question Type: {question_type}
+            """
+
+# Digits, operators, and a lone variable only — no words to search for
+_ARITHMETIC_RE = re.compile(r"[\d\s+\-*/^=().,xXyY?]+")
+
+def _needs_kb(question: str) -> bool:
+    """
+    Decide whether a question can benefit from the knowledge base.
+
+    Trivially arithmetic inputs (a large share of pasted SAT math) gain
+    nothing from strategy lookups, so the solve prompt can skip the
+    embed-and-search round trip entirely.
+
+    Args:
+        question (str): The user's question
+
+    Returns:
+        bool: False when the question is arithmetic-only
+    """
+    stripped = question.strip()
+    if not stripped:
+        return True
+    if _ARITHMETIC_RE.fullmatch(stripped):
+        return False
+    if len(stripped) < 30 and all(not c.isalpha() or c in "xXyY" for c in stripped):
+        return False
+    return True
+
+# Memory type of each method's results item and the history list it feeds
+_RESULT_TYPES = {
+    "sat_problem": "sat_solution",
+    "problem_question": "problem_answer",
+    "knowledge_question": "knowledge_answer",
+}
+
+# Histories are ring buffers so a long session can't grow session state
+# (serialized on every rerun) without bound
+_HISTORY_MAXLEN = 50
+
+_HISTORY_KEYS = {
+    "sat_problem": "problem_solver_history",
+    "problem_question": "knowledge_qa_history",
+    "knowledge_question": "knowledge_qa_history",
+}
+
 class SATAgent:
     """
     Main SAT tutoring agent that coordinates planning, execution, and memory.
@@ -31,12 +164,14 @@ class SATAgent:
         self.planner = Planner(api_key)
         self.executor = Executor(api_key)
         self.memory = Memory()
-        
-        # Initialize session state
-        if 'problem_solver_history' not in st.session_state:
-            st.session_state.problem_solver_history = []
-        if 'knowledge_qa_history' not in st.session_state:
-            st.session_state.knowledge_qa_history = []
+
+        # Semantic response cache: near-duplicate questions (cos >= 0.95)
+        # skip the whole plan-and-execute pipeline and return the earlier
+        # response, which is the dominant cost per interaction
+        self._response_cache = _SemanticCache(
+            self.executor.rag_system._generate_query_embedding,
+            threshold=0.95, capacity=256, ttl=3600.0
+        )
     
     def solve_sat_problem(self, question: str, question_type: str = "auto") -> dict:
         """
@@ -49,73 +184,47 @@ class SATAgent:
         Returns:
             dict: Complete response with plan, execution results, and memory
         """
+        template = _SOLVE_PLAN_TEMPLATE if _needs_kb(question) else _SOLVE_MATH_ONLY_TEMPLATE
+        prompt = template.format_map(
+            {'question': question, 'question_type': question_type}
+        )
+        return asyncio.run(self._plan_and_execute(
+            question, prompt, "sat_problem", {"question_type": question_type}
+        ))
+
+    def solve_sat_problem_stream(self, question: str, question_type: str = "auto"):
+        """
+        Solve a SAT problem, yielding pipeline events as they happen.
+
+        Yields "plan" as soon as planning finishes, one "step" per executor
+        task as it completes, and finally "response" with the same dict
+        solve_sat_problem returns, so the UI can render incrementally.
+
+        Args:
+            question (str): The SAT question to solve
+            question_type (str): Type of question (math, english, or auto-detect)
+
+        Yields:
+            dict: Events with a "kind" of "plan", "step", or "response"
+        """
+        template = _SOLVE_PLAN_TEMPLATE if _needs_kb(question) else _SOLVE_MATH_ONLY_TEMPLATE
+        prompt = template.format_map(
+            {'question': question, 'question_type': question_type}
+        )
+        stream = self._plan_and_execute_stream(
+            question, prompt, "sat_problem", {"question_type": question_type}
+        )
+        # Bridge the async generator into Streamlit's synchronous script
+        loop = asyncio.new_event_loop()
         try:
-            # Store the question in memory
-            question_memory = {
-                "type": "sat_problem",
-                "content": question,
-                "question_type": question_type
-            }
-            memory_id = self.memory.store(question_memory)
-            
-            # Create a plan for solving the SAT problem
-            plan = self.planner.create_plan(f"""
-            Solve this SAT question step by step:
-            
-            Question: {question}
-            Question Type: {question_type}
-            
-            Create a detailed plan that:
-            1. Identifies what type of SAT question this is (math/english subtype)
-            2. If helpful, searches knowledge base for relevant strategies using search_knowledge tool
-            3. Breaks down the solution into clear, logical steps
-            4. Explains the reasoning and strategy for each step
-            5. Shows all work for math problems or analysis for english
-            6. Provides the final answer with confidence explanation
-            
-            Available knowledge base tools if needed:
-            - search_knowledge(query, subject="all", max_results=3): Semantic search using RAG
-            - get_context(query, subject="all"): Get formatted context for concepts
-            - calculator(expression): Perform calculations
-            
-            Make this educational - explain WHY each step is taken.
-            """)
-            
-            # Execute the plan
-            results = self.executor.execute_plan(plan)
-            
-            # Store results in memory
-            results_memory = {
-                "type": "sat_solution",
-                "content": results,
-                "related_question": memory_id
-            }
-            self.memory.store(results_memory)
-            
-            # Create response
-            response = {
-                "question": question,
-                "question_type": question_type,
-                "plan": plan,
-                "results": results,
-                "memory_id": memory_id,
-                "status": "success"
-            }
-            
-            # Add to problem solver history
-            st.session_state.problem_solver_history.append(response)
-            
-            return response
-            
-        except Exception as e:
-            error_response = {
-                "question": question,
-                "error": str(e),
-                "status": "error"
-            }
-            st.session_state.problem_solver_history.append(error_response)
-            return error_response
-    
+            while True:
+                try:
+                    yield loop.run_until_complete(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.close()
+
     def answer_problem_question(self, question: str, problem_context: str, answer_context: str) -> dict:
         """
         Answer a question about a specific problem and its explanation.
@@ -128,71 +237,15 @@ class SATAgent:
         Returns:
             dict: Response with contextualized answer
         """
-        try:
-            # Store the question in memory
-            question_memory = {
-                "type": "problem_question",
-                "content": question,
-                "problem_context": problem_context,
-                "answer_context": answer_context
-            }
-            memory_id = self.memory.store(question_memory)
-            
-            # Create a plan for answering using the specific problem context
-            plan = self.planner.create_plan(f"""
-            Answer this question about a specific SAT problem and its solution:
-            
-            ORIGINAL PROBLEM: {problem_context}
-            
-            PROVIDED ANSWER/EXPLANATION: {answer_context}
-            
-            USER'S QUESTION: {question}
-            
-            Create a plan that:
-            1. Analyzes the original problem and provided explanation
-            2. Identifies what specific aspect the user is asking about
-            3. Provides a clear, educational answer based on the context
-            4. References specific parts of the problem or explanation as needed
-            5. Offers additional insights or alternative approaches if relevant
-            
-            Make this helpful for understanding the specific problem and solution provided.
-            """)
-            
-            # Execute the plan
-            results = self.executor.execute_plan(plan)
-            
-            # Store results in memory
-            results_memory = {
-                "type": "problem_answer",
-                "content": results,
-                "related_question": memory_id
-            }
-            self.memory.store(results_memory)
-            
-            # Create response
-            response = {
-                "question": question,
-                "problem_context": problem_context,
-                "answer_context": answer_context,
-                "plan": plan,
-                "results": results,
-                "memory_id": memory_id,
-                "status": "success"
-            }
-            
-            # Add to knowledge Q&A history
-            st.session_state.knowledge_qa_history.append(response)
-            
-            return response
-            
-        except Exception as e:
-            error_response = {
-                "question": question,
-                "error": str(e),
-                "status": "error"
-            }
-            st.session_state.knowledge_qa_history.append(error_response)
-            return error_response
+        prompt = _PROBLEM_QA_TEMPLATE.format_map({
+            'question': question,
+            'problem_context': problem_context,
+            'answer_context': answer_context
+        })
+        return asyncio.run(self._plan_and_execute(
+            question, prompt, "problem_question",
+            {"problem_context": problem_context, "answer_context": answer_context}
+        ))
 
     def answer_knowledge_question(self, question: str, topic_focus: str = "all") -> dict:
         """
@@ -205,70 +258,157 @@ class SATAgent:
         Returns:
             dict: Response with answer and source documents
         """
+        prompt = _KNOWLEDGE_QA_TEMPLATE.format_map(
+            {'question': question, 'topic_focus': topic_focus}
+        )
+        return asyncio.run(self._plan_and_execute(
+            question, prompt, "knowledge_question", {"topic_focus": topic_focus}
+        ))
+
+    async def _plan_and_execute(self, question: str, prompt: str,
+                                memory_type: str, extras: dict) -> dict:
+        """
+        Shared async pipeline behind the three public entry points.
+
+        Args:
+            question (str): The user's question
+            prompt (str): The rendered planner prompt
+            memory_type (str): Memory type tag for the question item
+            extras (dict): Method-specific fields merged into the stored
+                question and the response (also scope the cache entry)
+
+        Returns:
+            dict: Response with plan, execution results, and memory
+        """
+        response = None
+        async for event in self._plan_and_execute_stream(question, prompt,
+                                                         memory_type, extras):
+            if event["kind"] == "response":
+                response = event["response"]
+        return response
+
+    async def _plan_and_execute_stream(self, question: str, prompt: str,
+                                       memory_type: str, extras: dict):
+        """
+        Event-streaming form of the shared pipeline.
+
+        Checks the semantic response cache, stores the question, plans and
+        executes on the async Gemini endpoint, stores the results, and
+        appends to the right history list, yielding progress along the way.
+
+        Args:
+            question (str): The user's question
+            prompt (str): The rendered planner prompt
+            memory_type (str): Memory type tag for the question item
+            extras (dict): Method-specific fields merged into the stored
+                question and the response (also scope the cache entry)
+
+        Yields:
+            dict: Events with a "kind" of "plan", "step", or "response"
+        """
+        history = st.session_state[_HISTORY_KEYS[memory_type]]
+        cache_params = {"kind": memory_type, **extras}
+        cache_vector, cached = self._response_cache.lookup(question, cache_params)
+        if cached is not None:
+            history.append(cached)
+            yield {"kind": "response", "response": cached}
+            return
+
         try:
             # Store the question in memory
-            question_memory = {
-                "type": "knowledge_question",
-                "content": question,
-                "topic_focus": topic_focus
-            }
-            memory_id = self.memory.store(question_memory)
-            
-            # Create a plan for answering using knowledge base
-            plan = self.planner.create_plan(f"""
-            Answer this question about SAT concepts using available study materials:
-            
-            Question: {question}
-            Topic Focus: {topic_focus}
-            
-            Create a plan that:
-            1. Identifies which SAT topics/concepts are relevant to this question
-            2. Searches the knowledge base for relevant study materials using search_knowledge tool
-            3. Retrieves specific topic content if needed using get_topic_content tool
-            4. Synthesizes information from multiple sources
-            5. Provides a comprehensive, educational answer with citations
-            
-            Available knowledge base tools:
-            - search_knowledge(query, subject="all", max_results=3): Semantic search using RAG
-            - get_context(query, subject="all", max_context_length=1500): Get formatted context
-            
-            Make this helpful for SAT preparation - include examples and tips where relevant.
-            """)
-            
-            # Execute the plan
-            results = self.executor.execute_plan(plan)
-            
+            memory_id = self.memory.store(
+                {"type": memory_type, "content": question, **extras}
+            )
+
+            # Create a plan and execute it on the async endpoint so
+            # independent steps overlap instead of serializing round trips
+            plan = await self.planner.acreate_plan(prompt)
+            yield {"kind": "plan", "plan": plan}
+
+            results = [None] * len(plan)
+            async for i, task_result in self.executor.aexecute_plan_stream(plan):
+                results[i] = task_result
+                yield {"kind": "step", "index": i, "result": task_result}
+
             # Store results in memory
-            results_memory = {
-                "type": "knowledge_answer",
+            self.memory.store({
+                "type": _RESULT_TYPES[memory_type],
                 "content": results,
                 "related_question": memory_id
-            }
-            self.memory.store(results_memory)
-            
-            # Create response
+            })
+
             response = {
                 "question": question,
-                "topic_focus": topic_focus,
+                **extras,
                 "plan": plan,
                 "results": results,
                 "memory_id": memory_id,
                 "status": "success"
             }
-            
-            # Add to knowledge Q&A history
-            st.session_state.knowledge_qa_history.append(response)
-            
-            return response
-            
+
+            history.append(response)
+            self._response_cache.store(question, cache_vector, response, cache_params)
+
+            yield {"kind": "response", "response": response}
+
         except Exception as e:
             error_response = {
                 "question": question,
                 "error": str(e),
                 "status": "error"
             }
-            st.session_state.knowledge_qa_history.append(error_response)
-            return error_response
+            history.append(error_response)
+            yield {"kind": "response", "response": error_response}
+
+@st.cache_resource(show_spinner=False)
+def _make_agent() -> SATAgent:
+    """
+    Build the agent once per process.
+
+    st.cache_resource shares the planner, executor, memory, and their warm
+    caches across reruns and sessions; per-session UI state stays in
+    st.session_state.
+
+    Returns:
+        SATAgent: The shared agent instance
+    """
+    return SATAgent()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _format_history_entry(entry_id, _entry):
+    """
+    Format a history entry into markdown blocks for the recent-items lists.
+
+    Cached on the entry id so reruns triggered by unrelated widget
+    interactions don't re-format unchanged history items.
+
+    Args:
+        entry_id: Stable cache key for the entry (memory id or question)
+        _entry (dict): The history entry (underscore-prefixed so Streamlit
+            doesn't hash the full dict)
+
+    Returns:
+        tuple: (expander label, list of markdown lines)
+    """
+    label = f"{_entry['question'][:50]}..."
+    lines = [f"**Question:** {_entry['question']}"]
+
+    if _entry.get('topic_focus'):
+        lines.append("**Type:** General SAT Concepts")
+        lines.append(f"**Focus:** {_entry.get('topic_focus', 'All topics')}")
+    elif _entry.get('problem_context'):
+        lines.append("**Type:** Specific Problem Q&A")
+        lines.append(f"**Problem:** {_entry.get('problem_context', '')[:100]}...")
+    else:
+        lines.append(f"**Type:** {_entry.get('question_type', 'Unknown')}")
+
+    if _entry.get("status") == "success":
+        done = "Solved" if _entry.get('question_type') else "Answered"
+        lines.append(f"**Status:** ✅ {done}")
+    else:
+        lines.append("**Status:** ❌ Error")
+
+    return label, lines
 
 def render_sat_problem_solver_tab(agent):
     """Render the SAT Problem Solver tab."""
@@ -293,49 +433,76 @@ def render_sat_problem_solver_tab(agent):
             help="Paste the complete SAT question you need help solving"
         )
     
-    # Solve button
+    # Solve button; results stream in as the executor finishes each step
     if st.button("🎯 Solve Problem", type="primary", disabled=not question.strip()):
         if question.strip():
-            with st.spinner("Analyzing and solving your SAT problem..."):
-                response = agent.solve_sat_problem(question.strip(), question_type)
-            
-            # Display results
-            if response["status"] == "success":
-                st.success("✅ Problem solved successfully!")
-                
-                # Show the solution plan
-                st.subheader("📋 Solution Strategy")
-                for i, step in enumerate(response["plan"], 1):
-                    with st.expander(f"Planning Step {i}", expanded=True):
-                        st.write(step.get('description', 'No description available'))
-                        if step.get('tools'):
-                            st.info(f"**Tools needed:** {', '.join(step['tools'])}")
-                
-                # Show detailed solution
-                st.subheader("🎯 Step-by-Step Solution")
-                for i, result in enumerate(response["results"], 1):
-                    with st.expander(f"Solution Step {i}", expanded=True):
-                        if result.get("status") == "success":
-                            st.write(result.get("result", "No result available"))
-                            if result.get("tool_used"):
-                                st.info(f"**Tool used:** {result['tool_used']}")
-                        else:
-                            st.error(f"Error in step {i}: {result.get('message', 'Unknown error')}")
-            
+            status_area = st.empty()
+            plan_area = st.container()
+            solution_area = st.container()
+            status_area.info("Analyzing and solving your SAT problem...")
+
+            response = None
+            steps_shown = 0
+            for event in agent.solve_sat_problem_stream(question.strip(), question_type):
+                if event["kind"] == "plan":
+                    with plan_area:
+                        st.subheader("📋 Solution Strategy")
+                        for i, step in enumerate(event["plan"], 1):
+                            with st.expander(f"Planning Step {i}", expanded=True):
+                                st.write(step.get('description', 'No description available'))
+                                if step.get('tools'):
+                                    st.info(f"**Tools needed:** {', '.join(step['tools'])}")
+                elif event["kind"] == "step":
+                    steps_shown += 1
+                    with solution_area:
+                        if steps_shown == 1:
+                            st.subheader("🎯 Step-by-Step Solution")
+                        result = event["result"]
+                        with st.expander(f"Solution Step {event['index'] + 1}", expanded=True):
+                            if result.get("status") == "success":
+                                st.write(result.get("result", "No result available"))
+                                if result.get("tool_used"):
+                                    st.info(f"**Tool used:** {result['tool_used']}")
+                            else:
+                                st.error(f"Error in step {event['index'] + 1}: "
+                                         f"{result.get('message', 'Unknown error')}")
+                else:
+                    response = event["response"]
+
+            if response is None or response["status"] != "success":
+                error = (response or {}).get('error', 'Unknown error')
+                status_area.error(f"❌ Error solving problem: {error}")
             else:
-                st.error(f"❌ Error solving problem: {response.get('error', 'Unknown error')}")
+                status_area.success("✅ Problem solved successfully!")
+                # A semantic cache hit skips the plan/step events; render
+                # the cached response in full instead
+                if steps_shown == 0:
+                    with plan_area:
+                        st.subheader("📋 Solution Strategy")
+                        for i, step in enumerate(response["plan"], 1):
+                            with st.expander(f"Planning Step {i}", expanded=True):
+                                st.write(step.get('description', 'No description available'))
+                                if step.get('tools'):
+                                    st.info(f"**Tools needed:** {', '.join(step['tools'])}")
+                    with solution_area:
+                        st.subheader("🎯 Step-by-Step Solution")
+                        for i, result in enumerate(response["results"], 1):
+                            with st.expander(f"Solution Step {i}", expanded=True):
+                                if result.get("status") == "success":
+                                    st.write(result.get("result", "No result available"))
+                                    if result.get("tool_used"):
+                                        st.info(f"**Tool used:** {result['tool_used']}")
+                                else:
+                                    st.error(f"Error in step {i}: {result.get('message', 'Unknown error')}")
     
     # Show recent problems
     if st.session_state.problem_solver_history:
         st.subheader("📚 Recent Problems")
-        for i, entry in enumerate(reversed(st.session_state.problem_solver_history[-3:]), 1):
-            with st.expander(f"Problem {i}: {entry['question'][:50]}..."):
-                st.write(f"**Question:** {entry['question']}")
-                st.write(f"**Type:** {entry.get('question_type', 'Unknown')}")
-                if entry.get("status") == "success":
-                    st.write("**Status:** ✅ Solved")
-                else:
-                    st.write("**Status:** ❌ Error")
+        for i, entry in enumerate(itertools.islice(reversed(st.session_state.problem_solver_history), 3), 1):
+            label, lines = _format_history_entry(entry.get("memory_id") or entry["question"], entry)
+            with st.expander(f"Problem {i}: {label}"):
+                for line in lines:
+                    st.write(line)
 
 def render_knowledge_qa_tab(agent):
     """Render the Knowledge Base Q&A tab."""
@@ -484,22 +651,11 @@ def render_knowledge_qa_tab(agent):
     # Show recent questions (for both types)
     if st.session_state.knowledge_qa_history:
         st.subheader("🗂️ Recent Questions")
-        for i, entry in enumerate(reversed(st.session_state.knowledge_qa_history[-5:]), 1):
-            with st.expander(f"Q{i}: {entry['question'][:50]}..."):
-                st.write(f"**Question:** {entry['question']}")
-                
-                # Show different info based on question type
-                if entry.get('topic_focus'):
-                    st.write(f"**Type:** General SAT Concepts")
-                    st.write(f"**Focus:** {entry.get('topic_focus', 'All topics')}")
-                elif entry.get('problem_context'):
-                    st.write(f"**Type:** Specific Problem Q&A")
-                    st.write(f"**Problem:** {entry.get('problem_context', '')[:100]}...")
-                
-                if entry.get("status") == "success":
-                    st.write("**Status:** ✅ Answered")
-                else:
-                    st.write("**Status:** ❌ Error")
+        for i, entry in enumerate(itertools.islice(reversed(st.session_state.knowledge_qa_history), 5), 1):
+            label, lines = _format_history_entry(entry.get("memory_id") or entry["question"], entry)
+            with st.expander(f"Q{i}: {label}"):
+                for line in lines:
+                    st.write(line)
 
 def main():
     """Main Streamlit application with 2-tab interface."""
@@ -512,11 +668,15 @@ def main():
     st.title("📚 SAT Step-by-Step AI Tutor")
     st.markdown("*An agentic AI that helps you master SAT questions and concepts*")
     
-    # Initialize the agent
+    # Per-session UI state; the cached agent below is shared across sessions
+    if 'problem_solver_history' not in st.session_state:
+        st.session_state.problem_solver_history = collections.deque(maxlen=_HISTORY_MAXLEN)
+    if 'knowledge_qa_history' not in st.session_state:
+        st.session_state.knowledge_qa_history = collections.deque(maxlen=_HISTORY_MAXLEN)
+
+    # Initialize the agent once per process
     try:
-        if 'agent' not in st.session_state:
-            st.session_state.agent = SATAgent()
-        agent = st.session_state.agent
+        agent = _make_agent()
     except ValueError as e:
         st.error(f"Configuration Error: {e}")
         st.info("Please make sure you have a `.env` file with your `GEMINI_API_KEY`")
@@ -530,8 +690,8 @@ def main():
         
         if st.button("Clear All Memory"):
             agent.memory.clear_working_memory()
-            st.session_state.problem_solver_history = []
-            st.session_state.knowledge_qa_history = []
+            st.session_state.problem_solver_history = collections.deque(maxlen=_HISTORY_MAXLEN)
+            st.session_state.knowledge_qa_history = collections.deque(maxlen=_HISTORY_MAXLEN)
             st.success("All memory cleared!")
         
         st.markdown("---")
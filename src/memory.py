@@ -8,10 +8,57 @@ across interactions with the agent.
 import os
 import json
 import datetime
+import re
+import atexit
+import sqlite3
+import time
 from typing import Dict, Any, List, Optional
-import numpy as np
 from pathlib import Path
 
+# orjson's C encoder/decoder is severalfold faster than stdlib json on
+# the nested plan/result dicts stored here; fall back when unavailable
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+
+    _loads = orjson.loads
+else:
+    def _dumps(obj) -> str:
+        return json.dumps(obj, default=str, separators=(",", ":"))
+
+    _loads = json.loads
+
+# numpy (and hnswlib, which drags numpy in) cost ~100ms of import time;
+# they are only needed once an embedder is registered, so they resolve
+# lazily and Streamlit cold start skips them entirely
+np = None
+hnswlib = None
+
+def _import_vector_deps() -> None:
+    """Import numpy, and hnswlib if available, on first semantic use."""
+    global np, hnswlib
+    if np is not None:
+        return
+    import numpy
+    np = numpy
+    # hnswlib is optional; without it semantic search stays a dense matmul
+    try:
+        import hnswlib as _hnsw
+        hnswlib = _hnsw
+    except ImportError:
+        pass
+
+# Word tokens only, so index entries aren't polluted by dict punctuation
+_TOKEN_RE = re.compile(r"\w+")
+
+# Below this many vectors a dense BLAS matmul beats the ANN index
+_ANN_THRESHOLD = 2000
+
 class Memory:
     """
     Memory class for storing and retrieving information across interactions.
@@ -34,10 +81,170 @@ class Memory:
         
         # Short-term (session) memory
         self.working_memory = []
-        
-        # Placeholder for vector store (would use a real embedding model in production)
-        self.vectors = []
-        self.memories = []
+        # Single SQLite store in WAL mode instead of one JSON file per
+        # memory; FTS5, when the build has it, backs the search fallback
+        self._db = sqlite3.connect(os.path.join(storage_dir, "memory.db"),
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS mem(id TEXT PRIMARY KEY, ts INTEGER, content BLOB)"
+        )
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS mem_fts USING fts5(text, id UNINDEXED)"
+            )
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        # Lowercased serialized content, parallel to working_memory, so
+        # search is a plain substring scan instead of str(dict).lower()
+        self._lower_cache = []
+        # id -> item index so retrieve_by_id is a hash lookup
+        self._by_id = {}
+        # Monotonic id counter; cheaper than len() and stable across clears
+        self._counter = 0
+
+        # Optional embedding hook; vectors are only computed once a real
+        # embedder is registered, and lazily at search time. Normalized
+        # vectors are quantized to int8 with a per-vector scale and live in
+        # one contiguous matrix, quartering memory and bandwidth while
+        # keeping search a single matmul; _vec_rows maps row -> item index
+        self._embedder = None
+        self._vec_matrix = None
+        self._scales = None
+        self._n_vecs = 0
+        self._vec_rows = []
+        self._embedded_count = 0
+        # Approximate-nearest-neighbor index, built lazily once the vector
+        # count outgrows the dense path
+        self._hnsw = None
+
+        # Write-back buffer for permanent stores; flushed in bursts so a
+        # plan-execute loop doesn't pay one open/write/close per item
+        self._pending = []
+        self._last_flush = time.time()
+        atexit.register(self.flush)
+
+    def set_embedder(self, embed_fn) -> None:
+        """
+        Register a real embedding function for semantic retrieval.
+
+        Args:
+            embed_fn: Callable mapping a text to an embedding vector
+        """
+        self._embedder = embed_fn
+        self._vec_matrix = None
+        self._scales = None
+        self._n_vecs = 0
+        self._vec_rows = []
+        self._embedded_count = 0
+        self._hnsw = None
+
+    def _ensure_embeddings(self) -> None:
+        """Embed items stored since the last search; no-op without an embedder."""
+        if self._embedder is None:
+            return
+        _import_vector_deps()
+        while self._embedded_count < len(self.working_memory):
+            item = self.working_memory[self._embedded_count]
+            index = self._embedded_count
+            self._embedded_count += 1
+            try:
+                vector = np.asarray(self._embedder(str(item["content"])), dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm == 0:
+                    continue
+                self._append_vector(vector / norm, index)
+            except Exception as e:
+                print(f"Error embedding memory item: {e}")
+
+    @staticmethod
+    def _quantize(vector):
+        """Symmetric int8 quantization; returns (int8 vector, scale)."""
+        scale = float(np.abs(vector).max()) / 127.0
+        if scale == 0:
+            return None, 0.0
+        return np.round(vector / scale).astype(np.int8), scale
+
+    def _append_vector(self, vector, index: int) -> None:
+        """Append a normalized vector to the matrix, growing it as needed."""
+        quantized, scale = self._quantize(vector)
+        if quantized is None:
+            return
+        if self._vec_matrix is None:
+            self._vec_matrix = np.empty((64, vector.shape[0]), dtype=np.int8)
+            self._scales = np.empty(64, dtype=np.float32)
+        elif self._n_vecs == self._vec_matrix.shape[0]:
+            rows = self._vec_matrix.shape[0] * 2
+            grown = np.empty((rows, self._vec_matrix.shape[1]), dtype=np.int8)
+            grown[:self._n_vecs] = self._vec_matrix[:self._n_vecs]
+            self._vec_matrix = grown
+            grown_scales = np.empty(rows, dtype=np.float32)
+            grown_scales[:self._n_vecs] = self._scales[:self._n_vecs]
+            self._scales = grown_scales
+        self._vec_matrix[self._n_vecs] = quantized
+        self._scales[self._n_vecs] = scale
+        self._vec_rows.append(index)
+        self._n_vecs += 1
+        if self._hnsw is not None:
+            try:
+                self._hnsw.add_items(vector.reshape(1, -1), [self._n_vecs - 1])
+            except Exception as e:
+                print(f"Error updating ANN index: {e}")
+        else:
+            self._maybe_build_ann()
+
+    def _maybe_build_ann(self) -> None:
+        """Build the HNSW index once the vector count crosses the threshold."""
+        if hnswlib is None or self._n_vecs < _ANN_THRESHOLD:
+            return
+        try:
+            index = hnswlib.Index(space='cosine', dim=self._vec_matrix.shape[1])
+            index.init_index(max_elements=1_000_000, ef_construction=200, M=16)
+            # hnswlib works in float space; dequantize the stored rows
+            dense = (self._vec_matrix[:self._n_vecs].astype(np.float32)
+                     * self._scales[:self._n_vecs, None])
+            index.add_items(dense, np.arange(self._n_vecs))
+            self._hnsw = index
+        except Exception as e:
+            print(f"Error building ANN index: {e}")
+
+    def _semantic_search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Rank working memories by cosine similarity to the query.
+
+        Args:
+            query (str): The search query
+            limit (int): Maximum number of results to return
+
+        Returns:
+            List[Dict[str, Any]]: The nearest memories, best first
+        """
+        try:
+            vector = np.asarray(self._embedder(query), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return []
+            vector /= norm
+            k = min(limit, self._n_vecs)
+            # O(log N) approximate lookup once the ANN index exists
+            if self._hnsw is not None:
+                labels, _ = self._hnsw.knn_query(vector.reshape(1, -1), k=k)
+                return [self.working_memory[self._vec_rows[row]] for row in labels[0]]
+            # One int8 matmul over the contiguous in-use rows with the
+            # per-vector scales applied afterwards, then an O(N)
+            # argpartition rather than a full sort
+            q_int8, q_scale = self._quantize(vector)
+            if q_int8 is None:
+                return []
+            sims = (self._vec_matrix[:self._n_vecs] @ q_int8.astype(np.int32))
+            sims = sims * self._scales[:self._n_vecs] * q_scale
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            return [self.working_memory[self._vec_rows[row]] for row in top]
+        except Exception as e:
+            print(f"Error in semantic search: {e}")
+            return []
     
     def store(self, item: Dict[str, Any], permanent: bool = False) -> str:
         """
@@ -50,9 +257,11 @@ class Memory:
         Returns:
             str: The ID of the stored memory
         """
-        # Add timestamp and generate ID
-        timestamp = datetime.datetime.now().isoformat()
-        memory_id = f"mem_{len(self.working_memory)}_{timestamp}"
+        # Add timestamp and generate ID; time_ns plus fixed-width hex is far
+        # cheaper than datetime.now().isoformat() on the store hot path
+        timestamp = time.time_ns()
+        memory_id = f"mem_{self._counter:08x}_{timestamp:016x}"
+        self._counter += 1
         
         # Add metadata
         memory_item = {
@@ -61,15 +270,11 @@ class Memory:
             "content": item,
         }
         
-        # Add to working memory
+        # Add to working memory; embeddings are deferred to search time
         self.working_memory.append(memory_item)
-        
-        # Simple mock vector embedding (just use the memory_id as a stand-in)
-        # In a real implementation, we would use an embedding model here
-        mock_vector = np.random.rand(128)  # Random 128-dim vector as a placeholder
-        self.vectors.append(mock_vector)
-        self.memories.append(memory_item)
-        
+        self._lower_cache.append(_dumps(item).lower())
+        self._by_id[memory_id] = memory_item
+
         # Store permanently if requested
         if permanent:
             self._save_to_disk(memory_item)
@@ -87,16 +292,18 @@ class Memory:
             Optional[Dict[str, Any]]: The retrieved memory or None if not found
         """
         # Check working memory first
-        for item in self.working_memory:
-            if item["id"] == memory_id:
-                return item
-        
+        hit = self._by_id.get(memory_id)
+        if hit is not None:
+            return hit
+
         # Check persistent storage
         try:
-            memory_path = os.path.join(self.storage_dir, f"{memory_id}.json")
-            if os.path.exists(memory_path):
-                with open(memory_path, 'r') as f:
-                    return json.load(f)
+            self.flush()
+            row = self._db.execute(
+                "SELECT content FROM mem WHERE id = ?", (memory_id,)
+            ).fetchone()
+            if row:
+                return _loads(row[0])
         except Exception as e:
             print(f"Error retrieving memory {memory_id}: {e}")
         
@@ -113,35 +320,57 @@ class Memory:
         Returns:
             List[Dict[str, Any]]: List of relevant memories
         """
-        # This is a simplified mock implementation
-        # In a real system, we would:
-        # 1. Generate a vector embedding for the query
-        # 2. Compare it to stored vectors using cosine similarity
-        # 3. Return the most similar items
-        
-        # For now, just return the most recent items
+        # Vectors are only computed here, and only if an embedder was
+        # registered via set_embedder
+        self._ensure_embeddings()
+
         results = []
-        for memory in reversed(self.working_memory):
-            # Simple keyword matching
-            if query.lower() in str(memory["content"]).lower():
-                results.append(memory)
-                if len(results) >= limit:
-                    break
-        
-        # If we don't have enough results, check disk storage
+        if self._n_vecs:
+            results = self._semantic_search(query, limit)
+
+        # Keyword matching over the most recent items fills any remaining
+        # slots; the precomputed lowercase cache makes each check one
+        # C-level substring scan
+        query_lower = query.lower()
         if len(results) < limit:
-            try:
-                for filename in os.listdir(self.storage_dir):
-                    if not filename.endswith(".json"):
+            seen_ids = {item["id"] for item in results}
+            lower_cache = self._lower_cache
+            for i in range(len(lower_cache) - 1, -1, -1):
+                if query_lower in lower_cache[i]:
+                    item = self.working_memory[i]
+                    if item["id"] in seen_ids:
                         continue
-                    
-                    with open(os.path.join(self.storage_dir, filename), 'r') as f:
-                        memory = json.load(f)
-                        if query.lower() in str(memory["content"]).lower():
-                            if memory not in results:
-                                results.append(memory)
-                                if len(results) >= limit:
-                                    break
+                    results.append(item)
+                    if len(results) >= limit:
+                        break
+        
+        # If we don't have enough results, run one query against the
+        # persistent store instead of scanning it file by file
+        if len(results) < limit:
+            try:
+                self.flush()
+                tokens = _TOKEN_RE.findall(query_lower)
+                if tokens:
+                    if self._fts:
+                        cursor = self._db.execute(
+                            "SELECT m.id, m.content FROM mem_fts f "
+                            "JOIN mem m ON m.id = f.id "
+                            "WHERE mem_fts MATCH ? LIMIT ?",
+                            (" ".join(tokens), limit)
+                        )
+                    else:
+                        cursor = self._db.execute(
+                            "SELECT id, content FROM mem "
+                            "WHERE lower(content) LIKE ? LIMIT ?",
+                            (f"%{query_lower}%", limit)
+                        )
+                    seen_ids = {item["id"] for item in results}
+                    for memory_id, blob in cursor:
+                        if memory_id in seen_ids:
+                            continue
+                        results.append(_loads(blob))
+                        if len(results) >= limit:
+                            break
             except Exception as e:
                 print(f"Error searching disk storage: {e}")
         
@@ -160,9 +389,13 @@ class Memory:
         # Count total items
         total_items = len(self.working_memory)
         
-        # Get time range
-        start_time = self.working_memory[0]["timestamp"]
-        end_time = self.working_memory[-1]["timestamp"]
+        # Get time range; timestamps are stored as integer nanoseconds and
+        # only formatted here, for display
+        def _fmt(ts):
+            return datetime.datetime.fromtimestamp(ts / 1e9).isoformat()
+
+        start_time = _fmt(self.working_memory[0]["timestamp"])
+        end_time = _fmt(self.working_memory[-1]["timestamp"])
         
         # Create a simple summary
         summary = f"Memory contains {total_items} items from {start_time} to {end_time}."
@@ -179,23 +412,69 @@ class Memory:
             memory_item (Dict[str, Any]): The memory to save
         """
         try:
-            memory_path = os.path.join(self.storage_dir, f"{memory_item['id']}.json")
-            with open(memory_path, 'w') as f:
-                json.dump(memory_item, f, indent=2)
+            data = _dumps(memory_item)
+            text = str(memory_item["content"]).lower()
+            self._pending.append(
+                (memory_item["id"], memory_item["timestamp"], data, text)
+            )
+            if len(self._pending) >= 32 or time.time() - self._last_flush > 1.0:
+                self.flush()
         except Exception as e:
             print(f"Error saving memory to disk: {e}")
+
+    def flush(self) -> None:
+        """Write any buffered permanent memories out in one transaction."""
+        if not self._pending:
+            return
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO mem(id, ts, content) VALUES (?, ?, ?)",
+                [(mid, ts, data) for mid, ts, data, _ in self._pending]
+            )
+            if self._fts:
+                self._db.executemany(
+                    "INSERT INTO mem_fts(text, id) VALUES (?, ?)",
+                    [(text, mid) for mid, _, _, text in self._pending]
+                )
+            self._db.execute("COMMIT")
+            self._pending = []
+            self._last_flush = time.time()
+        except Exception as e:
+            try:
+                self._db.execute("ROLLBACK")
+            except Exception:
+                pass  # No transaction to roll back (e.g. BEGIN itself failed)
+            print(f"Error flushing memory to disk: {e}")
     
     def clear_working_memory(self) -> None:
         """Clear the current working memory."""
         self.working_memory = []
-        
+        self._lower_cache = []
+        self._by_id = {}
+        self._vec_matrix = None
+        self._scales = None
+        self._n_vecs = 0
+        self._vec_rows = []
+        self._embedded_count = 0
+        self._hnsw = None
+
     def clear_all(self) -> None:
         """Clear all memory, including persistent storage (use with caution)."""
         self.working_memory = []
-        
+        self._lower_cache = []
+        self._by_id = {}
+        self._vec_matrix = None
+        self._scales = None
+        self._n_vecs = 0
+        self._vec_rows = []
+        self._embedded_count = 0
+        self._hnsw = None
+
+        self._pending = []
         try:
-            for filename in os.listdir(self.storage_dir):
-                if filename.endswith(".json"):
-                    os.remove(os.path.join(self.storage_dir, filename))
+            self._db.execute("DELETE FROM mem")
+            if self._fts:
+                self._db.execute("DELETE FROM mem_fts")
         except Exception as e:
             print(f"Error clearing persistent memory: {e}")
@@ -5,8 +5,29 @@ This module is responsible for breaking down user tasks into subtasks
 and planning the execution steps.
 """
 
+import asyncio
+
 from typing import List, Dict, Any
 from google import genai
+from google.genai import types
+from pydantic import BaseModel
+
+from _genai import get_client
+
+
+class Subtask(BaseModel):
+    """One plan step as the model must return it in JSON mode."""
+    description: str
+    tools: List[str] = []
+    dependencies: List[str] = []
+
+
+# Structured output: the SDK validates the model's JSON against the schema,
+# so _parse_plan gets typed subtasks instead of free-form text to salvage
+_PLAN_CONFIG = types.GenerateContentConfig(
+    response_mime_type='application/json',
+    response_schema=list[Subtask],
+)
 
 class Planner:
     """
@@ -21,19 +42,11 @@ class Planner:
             api_key (str): Google API key for Gemini access
         """
         self.api_key = api_key
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_client(api_key)
     
-    def create_plan(self, user_input: str) -> List[Dict[str, Any]]:
-        """
-        Create a plan by breaking down the user input into subtasks.
-        
-        Args:
-            user_input (str): The user's request or task
-            
-        Returns:
-            List[Dict[str, Any]]: A list of subtasks with their details
-        """
-        prompt = f"""
+    def _build_prompt(self, user_input: str) -> str:
+        """Build the plan-generation prompt for a user task."""
+        return f"""
         Break down the following user task into a series of subtasks that can be executed:
         
         USER TASK: {user_input}
@@ -45,21 +58,64 @@ class Planner:
         
         Format your response as a JSON list of subtasks.
         """
-        
-        response = self.client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=prompt
-        )
-        
+
+    def _parse_plan(self, response) -> List[Dict[str, Any]]:
+        """Convert a structured-output response into the plan's subtask list."""
         try:
-            # Extract and parse the plan from the response
-            # This is a simplified version - in a real app, you'd want more robust parsing
-            plan_text = response.text
-            # For now, we'll return a simple list with the raw response
-            return [{"description": plan_text, "tools": [], "dependencies": []}]
+            subtasks = response.parsed
+            if subtasks:
+                return [subtask.model_dump() for subtask in subtasks]
+            # Schema validation produced nothing; keep the raw text visible
+            return [{"description": response.text, "tools": [], "dependencies": []}]
         except Exception as e:
             print(f"Error creating plan: {e}")
             return [{"description": "Error creating plan", "tools": [], "dependencies": []}]
+
+    def create_plan(self, user_input: str) -> List[Dict[str, Any]]:
+        """
+        Create a plan by breaking down the user input into subtasks.
+        
+        Args:
+            user_input (str): The user's request or task
+            
+        Returns:
+            List[Dict[str, Any]]: A list of subtasks with their details
+        """
+        return asyncio.run(self.acreate_plan(user_input))
+
+    def create_plans(self, user_inputs: List[str]) -> List[List[Dict[str, Any]]]:
+        """
+        Create plans for several tasks at once, overlapping the model calls.
+
+        Args:
+            user_inputs (List[str]): The user requests to plan for
+
+        Returns:
+            List[List[Dict[str, Any]]]: One plan per input, in input order
+        """
+        async def _gather():
+            return await asyncio.gather(
+                *(self.acreate_plan(user_input) for user_input in user_inputs)
+            )
+
+        return asyncio.run(_gather())
+
+    async def acreate_plan(self, user_input: str) -> List[Dict[str, Any]]:
+        """
+        Async variant of create_plan, using the client's non-blocking endpoint.
+        
+        Args:
+            user_input (str): The user's request or task
+            
+        Returns:
+            List[Dict[str, Any]]: A list of subtasks with their details
+        """
+        response = await self.client.aio.models.generate_content(
+            model='gemini-2.0-flash-exp',
+            contents=self._build_prompt(user_input),
+            config=_PLAN_CONFIG
+        )
+        return self._parse_plan(response)
     
     def refine_plan(self, plan: List[Dict[str, Any]], feedback: str) -> List[Dict[str, Any]]:
         """
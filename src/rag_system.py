@@ -5,38 +5,182 @@ This module implements a semantic search system using embeddings to find
 relevant content from the SAT knowledge base for better question answering.
 """
 
+import io
 import os
 import json
+import re
+import collections
+import hashlib
+import shelve
+import sqlite3
+import time
 import chromadb
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from _genai import get_client
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from google import genai
-import uuid
-import time
+
+# On-disk cache for query embeddings so repeated runs skip the Gemini call
+QUERY_CACHE_PATH = ".query_cache"
+
+# In-memory LRU in front of the on-disk cache; a repeated query costs a
+# dict lookup instead of a shelve open or an API round trip
+QUERY_CACHE_SIZE = 1024
+
+# Texts per embed_content request (the API accepts batched contents)
+EMBED_BATCH_SIZE = 64
+
+# text-embedding-004 output width; used only until the first real
+# embedding pins self.dim, so a model swap can't silently mismatch
+EMBED_DIM_DEFAULT = 768
+
+# Chunking: target size and overlap in tokens, at roughly 4 chars per token
+CHUNK_MAX_TOKENS = 500
+CHUNK_OVERLAP_TOKENS = 100
+CHUNK_CHARS_PER_TOKEN = 4
+
+# Markdown ATX headings mark preferred chunk boundaries
+_HEADING_RE = re.compile(r'^#{1,6} .*$', re.MULTILINE)
+
+# Concurrent file reads during the index build (I/O bound, so threads help)
+READ_WORKERS = 16
+
+# MMR re-ranking: candidate pool multiplier and relevance/diversity trade-off
+MMR_POOL_FACTOR = 3
+MMR_LAMBDA = 0.7
+
+# Chroma HNSW tuning. Defaults suit tiny collections; with thousands of
+# chunks, a higher construction_ef builds a tighter graph once so
+# search_ef can stay small per query (predictable latency), while M=16
+# keeps per-node links — and index memory — modest for a corpus this size.
+# Vectors are L2-normalized before storage, so inner-product space gives
+# cosine ranking with a plain dot product per distance call.
+_HNSW_PARAMS = {
+    "hnsw:space": "ip",
+    "hnsw:M": 16,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 40,
+}
+
+# Hybrid search: BM25 keyword first stage mirrored into its own FTS5 file
+FTS_DB_PATH = "./chroma_db/fts.db"
+FTS_CANDIDATES = 100
+HYBRID_BM25_WEIGHT = 0.4
+HYBRID_DENSE_WEIGHT = 0.6
+
+# Word tokens for FTS MATCH queries (raw text breaks the MATCH grammar)
+_FTS_TOKEN_RE = re.compile(r"\w+")
+
+# Persistent document-embedding cache, next to the Chroma data
+EMBED_CACHE_PATH = "./chroma_db/embed_cache.sqlite"
+
+class EmbeddingCache:
+    """
+    Persistent content-hash -> vector cache for document embeddings.
+
+    Rebuilding the index only pays the Gemini round trip for documents
+    whose content actually changed; everything else is a local lookup.
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): Location of the SQLite cache file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings(hash TEXT PRIMARY KEY, vec BLOB)"
+        )
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Hash a text together with the model name into a cache key."""
+        return hashlib.sha256(f"text-embedding-004\0{text}".encode()).hexdigest()
+
+    def get(self, hash_hex: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached vector.
+
+        Args:
+            hash_hex (str): Key from EmbeddingCache.key()
+
+        Returns:
+            Optional[np.ndarray]: The cached float32 vector, or None on a miss
+        """
+        try:
+            row = self._db.execute(
+                "SELECT vec FROM embeddings WHERE hash = ?", (hash_hex,)
+            ).fetchone()
+            if row is None:
+                return None
+            return np.frombuffer(row[0], dtype=np.float32)
+        except Exception as e:
+            print(f"Error reading embedding cache: {e}")
+            return None
+
+    def put_many(self, hashes: List[str], vectors: List[List[float]]) -> None:
+        """
+        Store a batch of vectors.
+
+        Args:
+            hashes (List[str]): Keys from EmbeddingCache.key()
+            vectors (List[List[float]]): The corresponding vectors
+        """
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings(hash, vec) VALUES (?, ?)",
+                [(h, np.asarray(v, dtype=np.float32).tobytes())
+                 for h, v in zip(hashes, vectors)]
+            )
+        except Exception as e:
+            print(f"Error writing embedding cache: {e}")
 
 class SATKnowledgeRAG:
     """
     RAG system for SAT knowledge base using ChromaDB and sentence transformers.
     """
     
-    def __init__(self, api_key: str, knowledge_base_path: str = "../satKnowledge", collection_name: str = "sat_knowledge"):
+    def __init__(self, api_key: str, knowledge_base_path: str = "../satKnowledge", collection_name: str = "sat_knowledge",
+                 client: Optional[genai.Client] = None):
         """
         Initialize the RAG system.
-        
+
         Args:
             api_key (str): Gemini API key for embeddings
             knowledge_base_path (str): Path to the SAT knowledge base directory
             collection_name (str): Name for the ChromaDB collection
+            client (Optional[genai.Client]): Existing Gemini client to reuse;
+                a new one is created when not provided
         """
         self.knowledge_base_path = Path(knowledge_base_path)
         self.collection_name = collection_name
-        
-        # Initialize Gemini client for embeddings
-        print("Initializing Gemini client for embeddings...")
-        self.client = genai.Client(api_key=api_key)
+
+        # Initialize Gemini client for embeddings (reuse the caller's if given)
+        if client is not None:
+            self.client = client
+        else:
+            print("Initializing Gemini client for embeddings...")
+            self.client = get_client(api_key)
         
         # Initialize ChromaDB
         self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
+
+        # Document embeddings persist across rebuilds, keyed by content hash
+        self._embed_cache = EmbeddingCache()
+
+        # Session-local LRU for query embeddings
+        self._query_cache = collections.OrderedDict()
+
+        # Embedding width, pinned from the first vector we actually see
+        self.dim: Optional[int] = None
+
+        # BM25 keyword index mirroring the collection, for hybrid search
+        self._fts = self._open_fts()
         
         # Get or create collection
         try:
@@ -44,7 +188,9 @@ class SATKnowledgeRAG:
             print(f"Loaded existing collection '{collection_name}'")
         except:
             print(f"Creating new collection '{collection_name}'")
-            self.collection = self.chroma_client.create_collection(name=collection_name)
+            self.collection = self.chroma_client.create_collection(
+                name=collection_name, metadata=dict(_HNSW_PARAMS)
+            )
             self._build_knowledge_index()
     
     def _build_knowledge_index(self):
@@ -54,61 +200,144 @@ class SATKnowledgeRAG:
         documents = []
         metadatas = []
         ids = []
-        
-        # Process both math and english subjects
-        for subject in ["math", "english"]:
-            subject_path = self.knowledge_base_path / subject
-            if subject_path.exists():
-                self._process_subject_directory(subject, subject_path, documents, metadatas, ids)
-        
+
+        md_paths = self._scan_knowledge_base()
+        if md_paths:
+            # Reads are pure I/O, so a thread pool overlaps the disk waits
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+                contents = list(pool.map(self._read_markdown_file, md_paths))
+            seen_ids = set()
+            for file_path, content in zip(md_paths, contents):
+                if not content.strip():
+                    continue
+                base_metadata = self._metadata_for_file(file_path)
+                for chunk_idx, (chunk, heading) in enumerate(self._chunk_markdown(content)):
+                    chunk_id = self._chunk_id(file_path, chunk)
+                    # Byte-identical chunks (overlapping windows over
+                    # repetitive text) hash to the same id; upsert()
+                    # rejects duplicate ids within one batch
+                    if chunk_id in seen_ids:
+                        continue
+                    seen_ids.add(chunk_id)
+                    documents.append(chunk)
+                    metadata = dict(base_metadata, chunk_idx=chunk_idx)
+                    if heading:
+                        metadata["heading"] = heading
+                    metadatas.append(metadata)
+                    ids.append(chunk_id)
+
         if documents:
             print(f"Adding {len(documents)} documents to the index...")
             # Generate embeddings using Gemini
             embeddings = self._generate_embeddings(documents)
             
-            self.collection.add(
+            self.collection.upsert(
                 documents=documents,
                 metadatas=metadatas,
                 embeddings=embeddings,
                 ids=ids
             )
+            self._fts_upsert(ids, documents, [m["file_path"] for m in metadatas])
             print("Knowledge index built successfully!")
         else:
             print("No documents found to index.")
     
-    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts using Gemini.
-        
+
+        Texts go out in batches per request rather than one call per
+        document, collapsing N network round-trips to N / batch size, and
+        a few batches are kept in flight at once so their round-trip times
+        overlap. Unchanged documents come straight from the persistent
+        content-hash cache. Results come back as one contiguous float32
+        matrix — an eighth the footprint of nested Python lists — with
+        rows in input order; Chroma accepts it directly.
+
         Args:
             texts (List[str]): List of texts to embed
-            
+
         Returns:
-            List[List[float]]: List of embedding vectors
+            np.ndarray: Float32 matrix of shape (len(texts), self.dim)
         """
-        embeddings = []
-        print(f"Generating embeddings for {len(texts)} documents...")
-        
-        for i, text in enumerate(texts):
+        # Serve unchanged documents from the persistent cache and only
+        # call the API for the rest
+        row_vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        hashes = [EmbeddingCache.key(text) for text in texts]
+        misses = []
+        for i, hash_hex in enumerate(hashes):
+            cached = self._embed_cache.get(hash_hex)
+            if cached is not None:
+                row_vectors[i] = cached
+                if self.dim is None:
+                    self.dim = len(cached)
+            else:
+                misses.append(i)
+
+        if misses:
+            print(f"Generating embeddings for {len(misses)} of {len(texts)} documents...")
+            miss_texts = [texts[i] for i in misses]
+            batches = [miss_texts[start:start + EMBED_BATCH_SIZE]
+                       for start in range(0, len(miss_texts), EMBED_BATCH_SIZE)]
+            if len(batches) > 1:
+                # Bounded concurrency: enough to hide latency without
+                # tripping the API's rate limits
+                with ThreadPoolExecutor(max_workers=5) as pool:
+                    batch_results = list(pool.map(self._embed_batch, batches))
+            else:
+                batch_results = [self._embed_batch(batch) for batch in batches]
+
+            vectors = [vector for batch_result in batch_results for vector in batch_result]
+            for i, vector in zip(misses, vectors):
+                row_vectors[i] = vector
+
+            # Don't cache the zero-vector failure fallback
+            good = [(hashes[i], vector) for i, vector in zip(misses, vectors) if vector.any()]
+            if good:
+                self._embed_cache.put_many([h for h, _ in good], [v for _, v in good])
+
+        dim = self.dim or EMBED_DIM_DEFAULT
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, vector in enumerate(row_vectors):
+            if vector is not None and len(vector) == dim:
+                out[i] = vector
+        # L2-normalize so inner-product distance equals cosine (zero-vector
+        # fallback rows stay zero through the clipped divisor)
+        out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
+
+    def _embed_batch(self, batch: List[str]) -> List[np.ndarray]:
+        """
+        Embed one batch of texts, backing off on rate limits.
+
+        Args:
+            batch (List[str]): The texts to embed in a single request
+
+        Returns:
+            List[np.ndarray]: One float32 vector per text; zeros on failure
+        """
+        delay = 1.0
+        for attempt in range(3):
             try:
-                # Use Gemini's embedding model
                 result = self.client.models.embed_content(
                     model='text-embedding-004',
-                    contents=text
+                    contents=batch
                 )
-                embeddings.append(result.embeddings[0].values)
-                
-                # Add small delay to avoid rate limiting
-                if i > 0 and i % 10 == 0:
-                    print(f"Generated embeddings for {i}/{len(texts)} documents...")
-                    time.sleep(0.1)
-                    
+                if self.dim is None and result.embeddings:
+                    self.dim = len(result.embeddings[0].values)
+                return [np.asarray(embedding.values, dtype=np.float32)
+                        for embedding in result.embeddings]
             except Exception as e:
-                print(f"Error generating embedding for document {i}: {e}")
-                # Use a zero vector as fallback
-                embeddings.append([0.0] * 768)  # Assuming 768-dimensional embeddings
-        
-        return embeddings
+                # Only rate-limit errors are worth retrying; back off and go again
+                message = str(e)
+                if attempt < 2 and ("429" in message or "RESOURCE_EXHAUSTED" in message or "exhausted" in message.lower()):
+                    time.sleep(delay)
+                    delay *= 2
+                    continue
+                print(f"Error generating embeddings for batch: {e}")
+                # Use zero vectors as fallback for the whole batch
+                dim = self.dim or EMBED_DIM_DEFAULT
+                return [np.zeros(dim, dtype=np.float32) for _ in batch]
     
     def _generate_query_embedding(self, query: str) -> List[float]:
         """
@@ -120,116 +349,210 @@ class SATKnowledgeRAG:
         Returns:
             List[float]: Embedding vector
         """
+        cache_key = f"text-embedding-004:{query}"
+
+        # In-memory LRU first: repeats within a session cost a dict lookup
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            self._query_cache.move_to_end(cache_key)
+            return cached
+
+        # Then the on-disk cache, which survives across runs
+        try:
+            with shelve.open(QUERY_CACHE_PATH) as cache:
+                if cache_key in cache:
+                    embedding = cache[cache_key]
+                    self._remember_query(cache_key, embedding)
+                    return embedding
+        except Exception as e:
+            print(f"Error reading query embedding cache: {e}")
+
         try:
             result = self.client.models.embed_content(
                 model='text-embedding-004',
                 contents=query
             )
-            return result.embeddings[0].values
+            embedding = result.embeddings[0].values
+            if self.dim is None:
+                self.dim = len(embedding)
+
+            # Store for future runs (best effort)
+            try:
+                with shelve.open(QUERY_CACHE_PATH) as cache:
+                    cache[cache_key] = embedding
+            except Exception as e:
+                print(f"Error writing query embedding cache: {e}")
+            self._remember_query(cache_key, embedding)
+
+            return embedding
         except Exception as e:
             print(f"Error generating query embedding: {e}")
-            return [0.0] * 768
-    
-    def _process_subject_directory(self, subject: str, subject_path: Path, documents: List[str], metadatas: List[Dict], ids: List[str]):
-        """Process a subject directory and extract content."""
-        
-        # Process main subject files with new naming pattern
-        overview_file = subject_path / f"{subject}-overview.md"
-        if overview_file.exists():
-            content = self._read_markdown_file(overview_file)
-            if content.strip():
-                documents.append(content)
-                metadatas.append({
-                    "subject": subject,
-                    "type": "subject_overview",
-                    "title": f"{subject.capitalize()} Overview",
-                    "file_path": str(overview_file)
-                })
-                ids.append(str(uuid.uuid4()))
-        
-        study_notes_file = subject_path / f"{subject}-study-notes.md"
-        if study_notes_file.exists():
-            content = self._read_markdown_file(study_notes_file)
-            if content.strip():
-                documents.append(content)
-                metadatas.append({
-                    "subject": subject,
-                    "type": "subject_notes",
-                    "title": f"{subject.capitalize()} Study Notes",
-                    "file_path": str(study_notes_file)
-                })
-                ids.append(str(uuid.uuid4()))
-        
-        # Process topic directories
-        for topic_dir in subject_path.iterdir():
-            if topic_dir.is_dir():
-                self._process_topic_directory(subject, topic_dir.name, topic_dir, documents, metadatas, ids)
-    
-    def _process_topic_directory(self, subject: str, topic_name: str, topic_path: Path, documents: List[str], metadatas: List[Dict], ids: List[str]):
-        """Process a topic directory and extract content."""
-        
-        # Process topic files with new naming pattern
-        for file in topic_path.iterdir():
-            if file.is_file() and file.suffix == '.md':
-                content = self._read_markdown_file(file)
-                if content.strip():
-                    if file.name.endswith('-overview.md'):
-                        doc_type = "topic_overview"
-                        title = f"{topic_name.replace('-', ' ').title()} Overview"
-                    elif file.name.endswith('-study-notes.md'):
-                        doc_type = "topic_notes"
-                        title = f"{topic_name.replace('-', ' ').title()} Study Notes"
-                    else:
-                        doc_type = "topic_content"
-                        title = f"{topic_name.replace('-', ' ').title()} - {file.stem}"
-                    
-                    documents.append(content)
-                    metadatas.append({
-                        "subject": subject,
-                        "topic": topic_name,
-                        "type": doc_type,
-                        "title": title,
-                        "file_path": str(file)
-                    })
-                    ids.append(str(uuid.uuid4()))
-            
-            elif file.is_dir():
-                # This is a subtopic directory
-                self._process_subtopic_directory(subject, topic_name, file.name, file, documents, metadatas, ids)
-    
-    def _process_subtopic_directory(self, subject: str, topic_name: str, subtopic_name: str, subtopic_path: Path, documents: List[str], metadatas: List[Dict], ids: List[str]):
-        """Process a subtopic directory and extract content."""
-        
-        for file in subtopic_path.iterdir():
-            if file.is_file() and file.suffix == '.md':
-                content = self._read_markdown_file(file)
-                if content.strip():
-                    if file.name.endswith('-overview.md'):
-                        doc_type = "subtopic_overview"
-                        title = f"{subtopic_name.replace('-', ' ').title()} Overview"
-                    elif file.name.endswith('-study-notes.md'):
-                        doc_type = "subtopic_notes"
-                        title = f"{subtopic_name.replace('-', ' ').title()} Study Notes"
-                    else:
-                        doc_type = "subtopic_content"
-                        title = f"{subtopic_name.replace('-', ' ').title()} - {file.stem}"
-                    
-                    documents.append(content)
-                    metadatas.append({
-                        "subject": subject,
-                        "topic": topic_name,
-                        "subtopic": subtopic_name,
-                        "type": doc_type,
-                        "title": title,
-                        "file_path": str(file)
-                    })
-                    ids.append(str(uuid.uuid4()))
+            return [0.0] * (self.dim or EMBED_DIM_DEFAULT)
+
+    def _remember_query(self, cache_key: str, embedding: List[float]) -> None:
+        """Insert a query embedding into the in-memory LRU, evicting the oldest."""
+        self._query_cache[cache_key] = embedding
+        self._query_cache.move_to_end(cache_key)
+        while len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
     
+    def _open_fts(self) -> Optional[sqlite3.Connection]:
+        """
+        Open (or create) the FTS5 keyword index that mirrors the collection.
+
+        Returns:
+            Optional[sqlite3.Connection]: The index connection, or None when
+                this SQLite build lacks FTS5 — search then stays dense-only
+        """
+        try:
+            Path(FTS_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(FTS_DB_PATH, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5("
+                "id UNINDEXED, file_path UNINDEXED, content, "
+                "tokenize='porter unicode61')"
+            )
+            return conn
+        except Exception as e:
+            print(f"Keyword index unavailable, using dense-only search: {e}")
+            return None
+
+    def _fts_upsert(self, ids: List[str], documents: List[str],
+                    file_paths: List[str]) -> None:
+        """
+        Mirror chunks into the keyword index, replacing any prior rows.
+
+        Args:
+            ids (List[str]): Chunk ids matching the Chroma collection
+            documents (List[str]): Chunk texts
+            file_paths (List[str]): Source file per chunk, for later deletes
+        """
+        if self._fts is None or not ids:
+            return
+        try:
+            self._fts.execute("BEGIN")
+            self._fts.executemany(
+                "DELETE FROM docs WHERE id = ?", [(i,) for i in ids]
+            )
+            self._fts.executemany(
+                "INSERT INTO docs(id, file_path, content) VALUES (?, ?, ?)",
+                list(zip(ids, file_paths, documents))
+            )
+            self._fts.execute("COMMIT")
+        except Exception as e:
+            self._fts.execute("ROLLBACK")
+            print(f"Error updating keyword index: {e}")
+
+    def _scan_knowledge_base(self) -> List[Path]:
+        """
+        Collect every markdown file under the indexed subject trees.
+
+        A single rglob pass per subject replaces the old three-level
+        iterdir recursion; metadata for each hit is derived from its
+        relative path by _metadata_for_file.
+
+        Returns:
+            List[Path]: Markdown file paths in stable sorted order
+        """
+        md_paths = []
+        for subject in ["math", "english"]:
+            subject_path = self.knowledge_base_path / subject
+            if subject_path.exists():
+                md_paths.extend(sorted(subject_path.rglob('*.md')))
+        return md_paths
+
+    @staticmethod
+    def _chunk_id(file_path: Path, chunk: str) -> str:
+        """
+        Deterministic id for a chunk, hashed from its source path and text.
+
+        The same content always maps to the same id, so re-running the
+        build upserts in place instead of piling up duplicate vectors
+        under fresh random ids.
+
+        Args:
+            file_path (Path): Source markdown file
+            chunk (str): The chunk text
+
+        Returns:
+            str: 32-hex-char blake2b digest
+        """
+        return hashlib.blake2b(
+            (str(file_path) + chunk).encode('utf-8'), digest_size=16
+        ).hexdigest()
+
+    @staticmethod
+    def _chunk_markdown(text: str, max_tokens: int = CHUNK_MAX_TOKENS,
+                        overlap: int = CHUNK_OVERLAP_TOKENS) -> List[Tuple[str, str]]:
+        """
+        Split markdown into heading-aligned chunks of roughly max_tokens.
+
+        Whole documents embed poorly: one long file averages many topics
+        into a single vector. Sections are cut at ATX heading lines and
+        greedily packed up to the token budget; a section that alone
+        exceeds the budget is sliced into overlapping windows so no text
+        is lost mid-thought.
+
+        Args:
+            text (str): The markdown source
+            max_tokens (int): Approximate chunk budget in tokens
+            overlap (int): Window overlap, in tokens, for oversized sections
+
+        Returns:
+            List[Tuple[str, str]]: (chunk_text, heading) pairs in order
+        """
+        max_chars = max_tokens * CHUNK_CHARS_PER_TOKEN
+        overlap_chars = overlap * CHUNK_CHARS_PER_TOKEN
+
+        boundaries = [m.start() for m in _HEADING_RE.finditer(text)]
+        if not boundaries or boundaries[0] != 0:
+            boundaries.insert(0, 0)
+        boundaries.append(len(text))
+        blocks = [text[a:b] for a, b in zip(boundaries, boundaries[1:])]
+
+        chunks = []
+        current = []
+        current_len = 0
+        current_heading = ""
+
+        def _flush():
+            nonlocal current, current_len
+            chunk = "".join(current).strip()
+            if chunk:
+                chunks.append((chunk, current_heading))
+            current = []
+            current_len = 0
+
+        for block in blocks:
+            heading_match = _HEADING_RE.match(block)
+            heading = (heading_match.group(0).lstrip('#').strip()
+                       if heading_match else current_heading)
+            if current and current_len + len(block) > max_chars:
+                _flush()
+            if not current:
+                current_heading = heading
+            if len(block) > max_chars:
+                # One section over budget: overlapping fixed-size windows
+                _flush()
+                current_heading = heading
+                step = max_chars - overlap_chars
+                for start in range(0, len(block), step):
+                    piece = block[start:start + max_chars].strip()
+                    if piece:
+                        chunks.append((piece, heading))
+                    if start + max_chars >= len(block):
+                        break
+                continue
+            current.append(block)
+            current_len += len(block)
+        _flush()
+        return chunks
+
     def _read_markdown_file(self, file_path: Path) -> str:
         """Read and return the content of a markdown file."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return file_path.read_text(encoding='utf-8', errors='replace')
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
             return ""
@@ -247,41 +570,246 @@ class SATKnowledgeRAG:
             List[Dict[str, Any]]: List of relevant knowledge base entries with similarity scores
         """
         try:
-            # Create where clause for subject filtering
-            where_clause = None
-            if subject_filter in ["math", "english"]:
-                where_clause = {"subject": subject_filter}
-            
             # Generate query embedding using Gemini
             query_embedding = self._generate_query_embedding(query)
-            
+
+            # BM25 first stage + dense re-rank when the keyword index is up
+            hybrid = self._hybrid_search(query, query_embedding, subject_filter, max_results)
+            if hybrid is not None:
+                return hybrid
+
             # Perform semantic search
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=max_results,
-                where=where_clause
-            )
-            
-            # Format results
-            formatted_results = []
-            if results['documents'][0]:  # Check if we have results
-                for i in range(len(results['documents'][0])):
-                    formatted_result = {
-                        "content": results['documents'][0][i],
-                        "metadata": results['metadatas'][0][i],
-                        "similarity_score": 1 - results['distances'][0][i],  # Convert distance to similarity
-                        "title": results['metadatas'][0][i].get('title', 'Unknown'),
-                        "subject": results['metadatas'][0][i].get('subject', 'Unknown'),
-                        "type": results['metadatas'][0][i].get('type', 'Unknown'),
-                        "file_path": results['metadatas'][0][i].get('file_path', 'Unknown')
-                    }
-                    formatted_results.append(formatted_result)
-            
-            return formatted_results
-            
+            return self._query_with_embedding(query_embedding, subject_filter, max_results)
+
         except Exception as e:
             print(f"Error during search: {e}")
             return []
+
+    def _hybrid_search(self, query: str, query_embedding: List[float],
+                       subject_filter: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Combine BM25 keyword matching with dense cosine re-ranking.
+
+        FTS5 prunes the corpus to a small candidate pool in under a
+        millisecond, which catches exact terms ("Pythagorean theorem")
+        that pure embedding search can miss; cosine similarity against
+        the query embedding then re-ranks just that pool. Scores blend
+        0.4 keyword / 0.6 dense.
+
+        Args:
+            query (str): The raw search query
+            query_embedding (List[float]): Its embedding
+            subject_filter (str): Filter by subject ('math', 'english', or 'all')
+            max_results (int): Maximum number of results to return
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Blended results, or None when
+                the keyword stage has nothing to offer (caller falls back
+                to dense-only search)
+        """
+        if self._fts is None:
+            return None
+        tokens = _FTS_TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return None
+
+        try:
+            # OR-join for recall: the dense re-rank handles precision
+            rows = self._fts.execute(
+                "SELECT id, bm25(docs) FROM docs WHERE docs MATCH ? "
+                "ORDER BY bm25(docs) LIMIT ?",
+                (" OR ".join(tokens), FTS_CANDIDATES)
+            ).fetchall()
+        except Exception as e:
+            print(f"Error querying keyword index: {e}")
+            return None
+        # A pool smaller than the result count can't fill the response;
+        # let the dense path serve the full max_results instead
+        if len(rows) < max_results:
+            return None
+
+        candidate_ids = [row[0] for row in rows]
+        got = self.collection.get(
+            ids=candidate_ids,
+            include=['documents', 'metadatas', 'embeddings']
+        )
+        if not got['ids']:
+            return None
+
+        # Keep only candidates still in the collection, honoring the filter
+        bm25_by_id = {row[0]: row[1] for row in rows}
+        docs = got['documents']
+        metas = got['metadatas']
+        keep = [i for i, meta in enumerate(metas)
+                if subject_filter not in ["math", "english"]
+                or meta.get('subject') == subject_filter]
+        if len(keep) < max_results:
+            return None
+
+        embeddings = np.asarray(got['embeddings'], dtype=np.float32)[keep]
+        norms = np.linalg.norm(embeddings, axis=1)
+        norms[norms == 0] = 1.0
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        cosine = (embeddings @ q) / (norms * q_norm) if q_norm else np.zeros(len(keep))
+
+        # bm25() is lower-is-better; min-max invert into [0, 1]
+        bm25 = np.array([bm25_by_id[got['ids'][i]] for i in keep], dtype=np.float32)
+        spread = bm25.max() - bm25.min()
+        keyword = (bm25.max() - bm25) / spread if spread else np.ones(len(keep))
+
+        blended = HYBRID_BM25_WEIGHT * keyword + HYBRID_DENSE_WEIGHT * cosine
+        order = np.argsort(blended)[::-1][:max_results]
+
+        return [
+            {
+                "content": docs[keep[i]],
+                "metadata": metas[keep[i]],
+                "similarity_score": float(blended[i]),
+                "title": metas[keep[i]].get('title', 'Unknown'),
+                "subject": metas[keep[i]].get('subject', 'Unknown'),
+                "type": metas[keep[i]].get('type', 'Unknown'),
+                "file_path": metas[keep[i]].get('file_path', 'Unknown')
+            }
+            for i in order
+        ]
+
+    def batch_search(self, queries: List[Tuple[str, str]], max_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search multiple queries using a single batched embedding request.
+
+        Args:
+            queries (List[Tuple[str, str]]): List of (query, subject_filter) pairs
+            max_results (int): Maximum number of results per query
+
+        Returns:
+            List[List[Dict[str, Any]]]: Search results for each query, in order
+        """
+        # Embed all query texts in one API round-trip
+        try:
+            result = self.client.models.embed_content(
+                model='text-embedding-004',
+                contents=[query for query, _ in queries]
+            )
+            query_embeddings = [embedding.values for embedding in result.embeddings]
+        except Exception as e:
+            print(f"Error generating batch embeddings: {e}")
+            query_embeddings = [[0.0] * (self.dim or EMBED_DIM_DEFAULT) for _ in queries]
+
+        all_results = []
+        for (query, subject_filter), query_embedding in zip(queries, query_embeddings):
+            try:
+                all_results.append(self._query_with_embedding(query_embedding, subject_filter, max_results))
+            except Exception as e:
+                print(f"Error during search for '{query}': {e}")
+                all_results.append([])
+
+        return all_results
+
+    def _query_with_embedding(self, query_embedding: List[float], subject_filter: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        Run a Chroma query for an already-computed embedding and format the results.
+
+        Args:
+            query_embedding (List[float]): The query embedding vector
+            subject_filter (str): Filter by subject ('math', 'english', or 'all')
+            max_results (int): Maximum number of results to return
+
+        Returns:
+            List[Dict[str, Any]]: List of relevant knowledge base entries with similarity scores
+        """
+        # Create where clause for subject filtering
+        where_clause = None
+        if subject_filter in ["math", "english"]:
+            where_clause = {"subject": subject_filter}
+
+        # Normalize to match the stored vectors: in ip space the reported
+        # distance is then exactly 1 - cosine
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm:
+            query_embedding = (query_vec / query_norm).tolist()
+
+        # Over-fetch so the MMR pass has a pool to diversify from
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=max_results * MMR_POOL_FACTOR,
+            where=where_clause,
+            include=['documents', 'metadatas', 'distances', 'embeddings']
+        )
+
+        # Format results
+        docs = results['documents'][0]
+        if not docs:
+            return []
+        metas = results['metadatas'][0]
+        dists = results['distances'][0]
+
+        order = range(len(docs))
+        embeddings = results.get('embeddings')
+        if embeddings is not None and embeddings[0] is not None:
+            order = self._mmr_select(
+                np.asarray(query_embedding, dtype=np.float32),
+                np.asarray(embeddings[0], dtype=np.float32),
+                max_results
+            )
+
+        return [
+            {
+                "content": docs[i],
+                "metadata": metas[i],
+                "similarity_score": 1 - dists[i],  # Convert distance to similarity
+                "title": metas[i].get('title', 'Unknown'),
+                "subject": metas[i].get('subject', 'Unknown'),
+                "type": metas[i].get('type', 'Unknown'),
+                "file_path": metas[i].get('file_path', 'Unknown')
+            }
+            for i in list(order)[:max_results]
+        ]
+
+    @staticmethod
+    def _mmr_select(query_vec: np.ndarray, candidates: np.ndarray, k: int,
+                    lambda_: float = MMR_LAMBDA) -> List[int]:
+        """
+        Pick k candidate indices by maximal marginal relevance.
+
+        All similarities come from two BLAS matmuls (candidates against the
+        query and against each other), so the selection loop only does k
+        cheap masked argmax passes — no per-pair Python cosine math.
+
+        Args:
+            query_vec (np.ndarray): The query embedding
+            candidates (np.ndarray): Candidate embeddings, shape (n, dim)
+            k (int): Number of indices to select
+            lambda_ (float): Relevance weight; 1 - lambda_ weighs diversity
+
+        Returns:
+            List[int]: Selected candidate indices, best first
+        """
+        n = candidates.shape[0]
+        if n <= k:
+            return list(range(n))
+
+        norms = np.linalg.norm(candidates, axis=1)
+        norms[norms == 0] = 1.0
+        normalized = candidates / norms[:, None]
+        query_norm = np.linalg.norm(query_vec)
+        query = query_vec / query_norm if query_norm else query_vec
+
+        sims = normalized @ query
+        pair = normalized @ normalized.T
+
+        selected = [int(np.argmax(sims))]
+        remaining = np.ones(n, dtype=bool)
+        remaining[selected[0]] = False
+        while len(selected) < k:
+            cand = np.flatnonzero(remaining)
+            penalty = pair[np.ix_(cand, selected)].max(axis=1)
+            scores = lambda_ * sims[cand] - (1 - lambda_) * penalty
+            pick = int(cand[np.argmax(scores)])
+            selected.append(pick)
+            remaining[pick] = False
+        return selected
     
     def get_relevant_context(self, query: str, subject_filter: str = "all", max_context_length: int = 2000) -> str:
         """
@@ -299,28 +827,131 @@ class SATKnowledgeRAG:
         
         if not results:
             return "No relevant information found in the knowledge base."
-        
-        context_parts = []
-        current_length = 0
-        
+
+        writer = io.StringIO()
+        remaining = max_context_length
+
         for result in results:
             source_info = f"Source: {result['title']} ({result['subject']}, {result['type']})"
             content = result['content']
-            
-            # Truncate content if it would exceed max length
-            available_length = max_context_length - current_length - len(source_info) - 10  # Buffer
-            if available_length > 100:  # Only include if we have reasonable space
-                if len(content) > available_length:
-                    content = content[:available_length] + "..."
-                
-                context_parts.append(f"{source_info}\n{content}")
-                current_length += len(source_info) + len(content) + 10
-            
-            if current_length >= max_context_length:
+
+            # Stop once the budget can't fit a useful amount of content
+            available = remaining - len(source_info) - 10  # Buffer
+            if available < 100:
                 break
-        
-        return "\n\n---\n\n".join(context_parts)
+            if len(content) > available:
+                content = content[:available] + "..."
+
+            writer.write(source_info)
+            writer.write("\n")
+            writer.write(content)
+            writer.write("\n\n---\n\n")
+            remaining -= len(source_info) + len(content) + 10
+
+        return writer.getvalue().rstrip("\n-")
     
+    def _metadata_for_file(self, file_path: Path) -> Dict[str, Any]:
+        """
+        Derive index metadata for a file from its location in the knowledge tree.
+
+        Args:
+            file_path (Path): Path to the markdown file
+
+        Returns:
+            Dict[str, Any]: Metadata matching what the full index build produces
+        """
+        try:
+            parts = file_path.relative_to(self.knowledge_base_path).parts
+        except ValueError:
+            parts = file_path.parts[-2:]
+
+        subject = parts[0] if parts else ""
+        metadata = {"subject": subject, "file_path": str(file_path)}
+        if len(parts) >= 3:
+            metadata["topic"] = parts[1]
+        if len(parts) >= 4:
+            metadata["subtopic"] = parts[2]
+
+        # parts includes the filename: math/math-overview.md has 2 parts
+        level = {2: "subject", 3: "topic", 4: "subtopic"}.get(len(parts), "topic")
+        if level == "subject":
+            label = subject.capitalize()
+        else:
+            label = parts[-2].replace('-', ' ').title()
+
+        name = file_path.name
+        if name.endswith('-overview.md'):
+            metadata["type"] = f"{level}_overview"
+            metadata["title"] = f"{label} Overview"
+        elif name.endswith('-study-notes.md'):
+            metadata["type"] = f"{level}_notes"
+            metadata["title"] = f"{label} Study Notes"
+        else:
+            metadata["type"] = f"{level}_content"
+            metadata["title"] = f"{label} - {file_path.stem}"
+
+        return metadata
+
+    def upsert_file(self, file_path) -> bool:
+        """
+        Re-embed a single changed file and patch the collection in place,
+        instead of rebuilding the whole index.
+
+        Args:
+            file_path (str | Path): Path to the markdown file that changed
+
+        Returns:
+            bool: True if the collection was updated successfully
+        """
+        file_path = Path(file_path)
+
+        try:
+            # Drop any existing vectors for this file
+            self.collection.delete(where={"file_path": str(file_path)})
+        except Exception as e:
+            print(f"Error removing old vectors for {file_path}: {e}")
+        if self._fts is not None:
+            try:
+                self._fts.execute("DELETE FROM docs WHERE file_path = ?",
+                                  (str(file_path),))
+            except Exception as e:
+                print(f"Error removing old keyword rows for {file_path}: {e}")
+
+        content = self._read_markdown_file(file_path)
+        if not content.strip():
+            return True  # Empty files simply drop out of the index
+
+        try:
+            base_metadata = self._metadata_for_file(file_path)
+            documents = []
+            metadatas = []
+            ids = []
+            seen_ids = set()
+            for chunk_idx, (chunk, heading) in enumerate(self._chunk_markdown(content)):
+                chunk_id = self._chunk_id(file_path, chunk)
+                # Duplicate ids in one batch make upsert() raise
+                if chunk_id in seen_ids:
+                    continue
+                seen_ids.add(chunk_id)
+                documents.append(chunk)
+                metadata = dict(base_metadata, chunk_idx=chunk_idx)
+                if heading:
+                    metadata["heading"] = heading
+                metadatas.append(metadata)
+                ids.append(chunk_id)
+            embeddings = self._generate_embeddings(documents)
+            self.collection.upsert(
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings,
+                ids=ids
+            )
+            self._fts_upsert(ids, documents, [str(file_path)] * len(ids))
+            return True
+        except Exception as e:
+            print(f"Error upserting {file_path}: {e}")
+            return False
+
     def rebuild_index(self):
         """Rebuild the entire knowledge index (useful when content is updated)."""
         print("Rebuilding knowledge index...")
@@ -331,8 +962,16 @@ class SATKnowledgeRAG:
         except:
             pass
         
+        if self._fts is not None:
+            try:
+                self._fts.execute("DELETE FROM docs")
+            except Exception as e:
+                print(f"Error clearing keyword index: {e}")
+
         # Create new collection and rebuild index
-        self.collection = self.chroma_client.create_collection(name=self.collection_name)
+        self.collection = self.chroma_client.create_collection(
+            name=self.collection_name, metadata=dict(_HNSW_PARAMS)
+        )
         self._build_knowledge_index()
     
     def get_stats(self) -> Dict[str, Any]: